@@ -164,8 +164,19 @@ def serve(port: int):
 
     print(f"Connected to server on port {port}")
 
+    # Strategy left searching in the background after the last response
+    pondering_strategy = None
+
     while True:
         raw_received = client.read()
+        # The engine's clock is already running, so searches budget from here rather than from when they start
+        received_at = time.time()
+
+        # Stopped before parsing, a pondering thread would otherwise slow the parse down
+        stop_pondering = getattr(pondering_strategy, "stop_pondering", None)
+        if stop_pondering:
+            stop_pondering()
+        pondering_strategy = None
 
         if raw_received:
             try:
@@ -186,6 +197,10 @@ def serve(port: int):
                         )
                     strategy = choose_strategy(is_zombie)
 
+                    start_clock = getattr(strategy, "start_clock", None)
+                    if start_clock:
+                        start_clock(received_at)
+
                 if phase == "CHOOSE_CLASSES":
                     raw_possible_classes: list = message["choices"]
                     possible_classes: list[CharacterClassType] = list(
@@ -298,6 +313,12 @@ def serve(port: int):
                 else:
                     raise RuntimeError(f"Unknown phase type {phase}")
 
+                # The response is already sent, so searching on in the background never delays it
+                start_pondering = getattr(strategy, "start_pondering", None)
+                if start_pondering:
+                    start_pondering(phase)
+                    pondering_strategy = strategy
+
                 if DEBUG:
                     print(f"[TURN {turn}]: Send response to {phase} phase to server!")
 
@@ -0,0 +1,126 @@
+from itertools import islice, product
+import heapq
+import random
+
+from game.character.action.ability_action import AbilityAction
+from game.character.action.ability_action_type import AbilityActionType
+from game.character.action.attack_action import AttackAction
+from game.character.action.attack_action_type import AttackActionType
+from game.character.action.move_action import MoveAction
+from strategy.pyengine import PyGameState, GamePhase
+
+UNIFORM = "uniform"
+ORDERED = "ordered"
+TOP_K = "top_k"
+
+
+def score_action(state: PyGameState, action, enemy_positions):
+    """
+    Cheap per-character heuristic, higher is better for the side acting
+    """
+    if action is None:
+        return 0
+
+    if isinstance(action, MoveAction):
+        if not enemy_positions:
+            return 0
+        distance = min(abs(action.destination.x - x) + abs(action.destination.y - y) for x, y in enemy_positions)
+        is_zombie = state.get_character_state(action.executing_character_id).is_zombie
+        return -distance if is_zombie else distance
+
+    if isinstance(action, AttackAction):
+        return 2 if action.type == AttackActionType.CHARACTER else 1
+
+    if isinstance(action, AbilityAction):
+        if action.type == AbilityActionType.HEAL:
+            return 3 - state.get_character_state(action.character_id_target).health
+        return 1
+
+    return 0
+
+
+def get_action_options(state: PyGameState, ordered = True):
+    """
+    Possible actions of every character that can act this phase, generated once.
+    Attacks and abilities are optional, so None is one of each character's options
+    """
+    options: dict[str, list] = {}
+    for action in state.get_possible_actions():
+        options.setdefault(action.executing_character_id, []).append(action)
+
+    if state.phase != GamePhase.MOVE:
+        for character_options in options.values():
+            character_options.append(None)
+
+    if ordered:
+        is_zombie = state.get_is_zombie_turn()
+        enemy_positions = [(character_state.position.x, character_state.position.y) for character_state in state.character_list if character_state.is_zombie != is_zombie]
+        for character_options in options.values():
+            character_options.sort(key=lambda action: score_action(state, action, enemy_positions), reverse=True)
+
+    return list(options.values())
+
+
+def to_joint_action(options, indices):
+    return [character_options[index] for character_options, index in zip(options, indices) if character_options[index] is not None]
+
+
+def generate_ordered(options):
+    # Best-first over index vectors, a combination costs the sum of its per-character ranks
+    start = (0,) * len(options)
+    frontier = [(0, start)]
+    seen = {start}
+    while frontier:
+        cost, indices = heapq.heappop(frontier)
+        yield to_joint_action(options, indices)
+
+        for character, index in enumerate(indices):
+            if index + 1 < len(options[character]):
+                successor = indices[:character] + (index + 1,) + indices[character + 1:]
+                if successor not in seen:
+                    seen.add(successor)
+                    heapq.heappush(frontier, (cost + 1, successor))
+
+
+def generate_uniform(options, rng: random.Random):
+    total = 1
+    for character_options in options:
+        total *= len(character_options)
+
+    seen = set()
+    while len(seen) < total:
+        indices = tuple(rng.randrange(len(character_options)) for character_options in options)
+        if indices in seen:
+            continue
+        seen.add(indices)
+        yield to_joint_action(options, indices)
+
+
+def generate_top_k(options, k):
+    truncated = [character_options[:k] for character_options in options]
+    for indices in product(*(range(len(character_options)) for character_options in truncated)):
+        yield to_joint_action(truncated, indices)
+
+
+def generate_joint_actions(state: PyGameState, mode = ORDERED, k = 2, rng: random.Random = None):
+    """
+    Lazily yields joint actions, one option per character, without building the combinatorial product
+
+    ordered: best-first by the summed heuristic rank of every character's option
+    uniform: random distinct combinations
+    top_k: every combination of each character's k best options
+    """
+    options = get_action_options(state, mode != UNIFORM)
+
+    if mode == ORDERED:
+        return generate_ordered(options)
+    if mode == UNIFORM:
+        return generate_uniform(options, rng or random.Random())
+    if mode == TOP_K:
+        return generate_top_k(options, k)
+
+    raise ValueError(f"Unknown joint action sampling mode {mode}")
+
+
+def take_joint_actions(state: PyGameState, count, mode = ORDERED, k = 2, rng: random.Random = None):
+    return list(islice(generate_joint_actions(state, mode, k, rng), count))
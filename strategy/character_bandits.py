@@ -0,0 +1,86 @@
+from array import array
+import math
+import random
+
+
+class CharacterBandits:
+    """
+    One UCB bandit per character at a node, for decoupled search where a joint action is each character's own pick
+
+    Arms of every character sit in one pair of typed arrays, character c owns arms offsets[c] to offsets[c + 1].
+    Arm numbers are global, so a joint action is identified by the tuple of its characters' arms.
+    Once the node may not grow, each character picks among the arms its children play and the child agreeing with
+    most of the picks is the one played
+    """
+
+    def __init__(self, options: list[list]):
+        # Each character's possible actions as from get_action_options, None stands for not acting
+        self.options = options
+        self.offsets = [0]
+        for character_options in options:
+            self.offsets.append(self.offsets[-1] + len(character_options))
+        self.visits = array("q", bytes(8 * self.offsets[-1]))
+        self.reward = array("d", bytes(8 * self.offsets[-1]))
+        self.updates = 0
+        # Position in the node's edge block of the child each joint action led to, positions survive the block moving
+        self.children: dict[tuple, int] = {}
+        # Arms of the joint action that made the edge at each position
+        self.edge_arms: list[tuple] = []
+        # Positions of the children playing each arm
+        self.arm_children: dict[int, list[int]] = {}
+        # Arms some child plays, per character
+        self.child_arms: list[list[int]] = [[] for _ in options]
+
+    def select(self, exploration_value, rng: random.Random, among_children = False):
+        """
+        Arm with the best upper confidence bound for every character, or for among_children the best of the arms
+        the children play. Untried arms come first, picked at random for every character on its own
+        so the first joint actions do not all take the same rank of option
+        """
+        arms = []
+        scale = 2 * math.log(max(self.updates, 1))
+        for character, (first, end) in enumerate(zip(self.offsets, self.offsets[1:])):
+            candidates = self.child_arms[character] if among_children else range(first, end)
+            visits = [self.visits[arm] for arm in candidates] if among_children else self.visits[first:end]
+            if 0 in visits:
+                arms.append(rng.choice([arm for arm, count in zip(candidates, visits) if count == 0]))
+                continue
+
+            values = [self.reward[arm] / count + exploration_value * math.sqrt(scale / count) for arm, count in zip(candidates, visits)]
+            arms.append(candidates[values.index(max(values))])
+
+        return tuple(arms)
+
+    def add_child(self, arms, position):
+        self.children[arms] = position
+        if position < len(self.edge_arms):
+            # Another joint action already reached the same state
+            return
+
+        self.edge_arms.append(arms)
+        for character, arm in enumerate(arms):
+            if arm not in self.arm_children:
+                self.arm_children[arm] = []
+                self.child_arms[character].append(arm)
+            self.arm_children[arm].append(position)
+
+    def get_nearest_child(self, arms):
+        """
+        Position of the child sharing the most arms with arms
+        """
+        agreement = [0] * len(self.edge_arms)
+        for arm in arms:
+            for position in self.arm_children.get(arm, ()):
+                agreement[position] += 1
+
+        return agreement.index(max(agreement))
+
+    def update(self, arms, reward):
+        for arm in arms:
+            self.visits[arm] += 1
+            self.reward[arm] += reward
+        self.updates += 1
+
+    def get_joint_action(self, arms):
+        return [character_options[arm - first] for character_options, first, arm in zip(self.options, self.offsets, arms)
+                if character_options[arm - first] is not None]
@@ -0,0 +1,112 @@
+from array import array
+
+from game.game_state import GameState
+from strategy.pyengine import Board, PyGameState, BOARD_SIZE, NO_TERRAIN, TERRAIN_CODES, ORTHOGONAL_NEIGHBORS, class_stats, position_to_index
+from game.character.character_class_type import CharacterClassType
+from game.terrain.terrain_type import TerrainType
+from game.util.position import Position
+
+UNREACHABLE = 0x7FFF
+ZOMBIE_MOVE_SPEED = class_stats[CharacterClassType.ZOMBIE]["Move_Speed"]
+
+
+class DistanceField:
+    """
+    Grid of walking distances, in tiles, from the closest of several sources, indexed like the board
+    """
+
+    def __init__(self, distances: array, move_speed: int = 1):
+        self.distances = distances
+        self.move_speed = move_speed
+
+    def at(self, index):
+        return self.distances[index]
+
+    def at_position(self, position: Position):
+        return self.distances[position_to_index(position)]
+
+    def turns_at(self, index):
+        distance = self.distances[index]
+        if distance == UNREACHABLE:
+            return UNREACHABLE
+        return -(-distance // self.move_speed)
+
+    def turns_at_position(self, position: Position):
+        return self.turns_at(position_to_index(position))
+
+
+def compute_distances(board: Board, sources: list[tuple[int, int]], ignore_barricades = False, max_distance = UNREACHABLE - 1) -> array:
+    """
+    Multi-source breadth-first search over the board, sources are (tile index, starting distance) pairs
+    so a source that is held back, like a stunned zombie, joins the wave late
+    """
+    distances = array("h", [UNREACHABLE]) * (BOARD_SIZE * BOARD_SIZE)
+    terrain_type, terrain_health = board.terrain_type, board.terrain_health
+    barricade = TERRAIN_CODES[TerrainType.BARRICADE]
+
+    pending = sorted(sources, key=lambda source: source[1], reverse=True)
+    frontier = []
+    distance = pending[-1][1] if pending else 0
+
+    while (frontier or pending) and distance <= max_distance:
+        while pending and pending[-1][1] <= distance:
+            index, _ = pending.pop()
+            if distances[index] > distance:
+                distances[index] = distance
+                frontier.append(index)
+
+        next_frontier = []
+        for index in frontier:
+            for neighbor in ORTHOGONAL_NEIGHBORS[index]:
+                if distances[neighbor] <= distance + 1:
+                    continue
+
+                code = terrain_type[neighbor]
+                if code != NO_TERRAIN and terrain_health[neighbor] != 0 and not (ignore_barricades and code == barricade):
+                    continue
+
+                distances[neighbor] = distance + 1
+                next_frontier.append(neighbor)
+
+        frontier = next_frontier
+        distance += 1
+
+    return distances
+
+
+def get_zombie_reach_field(state: PyGameState, max_distance = UNREACHABLE - 1) -> DistanceField:
+    """
+    How long any zombie needs to reach each tile, turns_at gives it in zombie turns
+    """
+    sources = [(character_state.tile, ZOMBIE_MOVE_SPEED if character_state.is_stunned() else 0)
+               for character_state in state.character_list if character_state.is_zombie]
+    return DistanceField(compute_distances(state.board, sources, max_distance=max_distance), ZOMBIE_MOVE_SPEED)
+
+
+def get_nearest_human_field(state: PyGameState, max_distance = UNREACHABLE - 1) -> DistanceField:
+    sources = [(character_state.tile, 0) for character_state in state.character_list if not character_state.is_zombie]
+    return DistanceField(compute_distances(state.board, sources, max_distance=max_distance))
+
+
+def board_from_game_state(game_state: GameState) -> Board:
+    board = Board()
+    for terrain in game_state.terrains.values():
+        board.set_terrain(position_to_index(terrain.position), terrain.id, terrain.type, terrain.health, terrain.can_attack_through)
+    return board
+
+
+def get_game_state_zombie_reach_field(game_state: GameState) -> DistanceField:
+    """
+    get_zombie_reach_field straight from the engine's game state, for strategies without a PyGameState
+    """
+    sources = [(position_to_index(character.position), ZOMBIE_MOVE_SPEED if character.is_stunned else 0)
+               for character in game_state.characters.values() if character.is_zombie]
+    return DistanceField(compute_distances(board_from_game_state(game_state), sources), ZOMBIE_MOVE_SPEED)
+
+
+def get_game_state_nearest_human_field(game_state: GameState) -> DistanceField:
+    """
+    get_nearest_human_field straight from the engine's game state
+    """
+    sources = [(position_to_index(character.position), 0) for character in game_state.characters.values() if not character.is_zombie]
+    return DistanceField(compute_distances(board_from_game_state(game_state), sources))
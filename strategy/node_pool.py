@@ -0,0 +1,182 @@
+from array import array
+
+from strategy.pyengine import PyGameState
+
+TERMINAL = 1
+FULLY_EXPANDED = 2
+ZOMBIE_TURN = 4
+
+NODE_FIELDS = (("visits", "q"), ("first_edge", "q"), ("edge_count", "q"), ("edge_capacity", "q"), ("flags", "b"))
+EDGE_FIELDS = (("edge_visits", "q"), ("edge_reward", "d"), ("edge_child", "q"))
+
+
+def grow(pool, fields, capacity):
+    for name, code in fields:
+        values = getattr(pool, name)
+        values.frombytes(bytes(array(code).itemsize * (capacity - len(values))))
+
+
+class NodePool:
+    """
+    Preallocated storage for a search tree, nodes and edges are indices into typed arrays rather than objects
+
+    The edges of a node sit in one contiguous block so selection can read its children's statistics as slices,
+    a block that fills up is moved to the end of the edge arrays with twice the room.
+    An edge points at its child node, so transpositions are edges from several parents to the same node.
+    A node whose state was dropped keeps its statistics but loses its edges, it is rebuilt from its parent when reached again
+    """
+
+    def __init__(self, capacity = 1024, edge_block = 6):
+        self.edge_block = edge_block
+        self.node_count = 0
+        self.edges_used = 0
+        # Nodes whose state has been dropped
+        self.dropped = 0
+        for name, code in NODE_FIELDS + EDGE_FIELDS:
+            setattr(self, name, array(code))
+        grow(self, NODE_FIELDS, capacity)
+        grow(self, EDGE_FIELDS, capacity * edge_block)
+
+        self.states: list[PyGameState] = [None] * capacity
+        # Lazy joint action generators of nodes still being expanded
+        self.sources: list = [None] * capacity
+        # Per-character bandits of nodes searched in decoupled mode
+        self.bandits: list = [None] * capacity
+        self.edge_actions: list = [None] * (capacity * edge_block)
+
+    def __len__(self):
+        return self.node_count
+
+    def add_node(self, state: PyGameState | None, flags = None):
+        node = self.node_count
+        if node == len(self.visits):
+            capacity = 2 * len(self.visits)
+            grow(self, NODE_FIELDS, capacity)
+            self.states.extend([None] * (capacity - len(self.states)))
+            self.sources.extend([None] * (capacity - len(self.sources)))
+            self.bandits.extend([None] * (capacity - len(self.bandits)))
+        self.node_count += 1
+
+        if flags is None:
+            is_terminal = state.turn == 200 or state.get_humans_count() == 0
+            flags = (TERMINAL | FULLY_EXPANDED if is_terminal else 0) | (ZOMBIE_TURN if state.get_is_zombie_turn() else 0)
+        if state is None:
+            self.dropped += 1
+        self.visits[node] = 0
+        self.first_edge[node] = 0
+        self.edge_count[node] = 0
+        self.edge_capacity[node] = 0
+        self.flags[node] = flags
+        self.states[node] = state
+        self.sources[node] = None
+        self.bandits[node] = None
+        return node
+
+    def allocate_edges(self, count):
+        first = self.edges_used
+        if first + count > len(self.edge_visits):
+            capacity = max(2 * len(self.edge_visits), first + count)
+            grow(self, EDGE_FIELDS, capacity)
+            self.edge_actions.extend([None] * (capacity - len(self.edge_actions)))
+        self.edges_used += count
+        return first
+
+    def add_edge(self, node, child, actions):
+        count = self.edge_count[node]
+        if count == self.edge_capacity[node]:
+            capacity = max(2 * count, self.edge_block)
+            old_first = self.first_edge[node]
+            first = self.allocate_edges(capacity)
+            for name, _ in EDGE_FIELDS:
+                values = getattr(self, name)
+                values[first:first + count] = values[old_first:old_first + count]
+            self.edge_actions[first:first + count] = self.edge_actions[old_first:old_first + count]
+            self.first_edge[node] = first
+            self.edge_capacity[node] = capacity
+
+        edge = self.first_edge[node] + count
+        self.edge_visits[edge] = 0
+        self.edge_reward[edge] = 0.0
+        self.edge_child[edge] = child
+        self.edge_actions[edge] = actions
+        self.edge_count[node] = count + 1
+        return edge
+
+    def get_edges(self, node):
+        first = self.first_edge[node]
+        return range(first, first + self.edge_count[node])
+
+    def find_edge(self, node, child):
+        first = self.first_edge[node]
+        children = self.edge_child[first:first + self.edge_count[node]]
+        return first + children.index(child) if child in children else -1
+
+    def is_terminal(self, node):
+        return self.flags[node] & TERMINAL != 0
+
+    def is_fully_expanded(self, node):
+        return self.flags[node] & FULLY_EXPANDED != 0
+
+    def is_zombie_turn(self, node):
+        return self.flags[node] & ZOMBIE_TURN != 0
+
+    def set_fully_expanded(self, node):
+        self.flags[node] |= FULLY_EXPANDED
+        self.sources[node] = None
+
+    def get_state_count(self):
+        return self.node_count - self.dropped
+
+    def drop_state(self, node):
+        """
+        Frees the node's state and forgets its edges, its visits and flags stay so selection can return to it
+        """
+        if self.states[node] is not None:
+            self.dropped += 1
+        self.states[node] = None
+        self.sources[node] = None
+        self.bandits[node] = None
+        self.edge_count[node] = 0
+        self.edge_capacity[node] = 0
+        if not self.is_terminal(node):
+            self.flags[node] &= ~FULLY_EXPANDED
+
+    def restore_state(self, node, state: PyGameState):
+        self.states[node] = state
+        self.dropped -= 1
+
+    def extract(self, root, keep = None):
+        """
+        New pool holding only the subtree under root, with root as node 0, and the old to new node numbering
+
+        With keep given, nodes outside it are copied with their states dropped and nothing below them
+        """
+        pool = NodePool(max(1024, self.node_count), self.edge_block)
+        mapping = {root: pool.add_node(self.states[root], self.flags[root])}
+        frontier = [root]
+
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                new_node = mapping[node]
+                pool.visits[new_node] = self.visits[node]
+                pool.flags[new_node] = self.flags[node]
+                pool.sources[new_node] = self.sources[node]
+                # Edges are copied in order, so the bandits' edge positions stay valid
+                pool.bandits[new_node] = self.bandits[node]
+                if keep is not None and node not in keep:
+                    pool.drop_state(new_node)
+                    continue
+
+                for edge in self.get_edges(node):
+                    child = self.edge_child[edge]
+                    if child not in mapping:
+                        mapping[child] = pool.add_node(self.states[child], self.flags[child])
+                        next_frontier.append(child)
+
+                    new_edge = pool.add_edge(new_node, mapping[child], self.edge_actions[edge])
+                    pool.edge_visits[new_edge] = self.edge_visits[edge]
+                    pool.edge_reward[new_edge] = self.edge_reward[edge]
+            frontier = next_frontier
+
+        return pool, mapping
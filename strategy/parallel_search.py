@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+
+from game.game_state import GameState
+from strategy.pyengine import PyGameState, GamePhase
+from strategy.action_generation import UNIFORM, ORDERED
+from strategy.tree_search import TreeSearch, SearchSession, DEFAULT_WIDENING
+from strategy.shared_tree import SharedTreeSearch
+
+PARALLEL_ROOT = "root"
+PARALLEL_TREE = "tree"
+
+
+def summarize(tree: TreeSearch, node, depth):
+    """
+    Visits and total reward of the children of node, depth levels deep, keyed by the child state's hash
+    """
+    summary = {}
+    if depth == 0:
+        return summary
+
+    pool = tree.pool
+    for edge in pool.get_edges(node):
+        child = pool.edge_child[edge]
+        if pool.states[child] is None:
+            continue
+        summary[pool.states[child].get_hash()] = (pool.edge_actions[edge], pool.edge_visits[edge], pool.edge_reward[edge], summarize(tree, child, depth - 1))
+
+    return summary
+
+
+def merge_summaries(summaries: list[dict]):
+    """
+    Sums the statistics of the same child across several summaries, level by level
+    """
+    merged = {}
+    for summary in summaries:
+        for key, (actions, visits, reward, children) in summary.items():
+            if key not in merged:
+                merged[key] = [actions, 0, 0, []]
+            merged[key][1] += visits
+            merged[key][2] += reward
+            merged[key][3].append(children)
+
+    return dict((key, (actions, visits, reward, merge_summaries(children))) for key, (actions, visits, reward, children) in merged.items())
+
+
+def run_worker(connection, player_is_zombie, exploration_constant, eps, search_options):
+    """
+    Worker process loop, searches every state it receives until it is sent None
+    """
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+
+        state_bytes, seed, depth = message
+        tree = TreeSearch(PyGameState.deserialize(state_bytes), None, None, exploration_constant, eps, player_is_zombie,
+                          seed=seed, verbose=False, **search_options)
+        tree.search()
+        connection.send((tree.num_rounds, summarize(tree, tree.root, depth)))
+
+    connection.close()
+
+
+class ParallelSearch:
+    """
+    Root-parallel search, every worker process grows its own tree from the same root with its own seed
+    and the statistics of the top levels are summed before picking actions
+
+    The nodes of our own turn take the ordered generator in every worker so all of them grow the same candidates
+    and their visits pool, the workers only differ below them
+
+    Workers are started on the first search and kept until close, so no process is forked per turn
+    """
+
+    def __init__(self, workers, player_is_zombie, exploration_constant = .1, eps = .9, seed = 0, **search_options):
+        self.workers = workers or os.cpu_count()
+        self.player_is_zombie = player_is_zombie
+        self.exploration_constant = exploration_constant
+        self.eps = eps
+        self.seed = seed
+        # With the ordered generator throughout every worker would grow the same tree
+        search_options.setdefault("sampling", UNIFORM)
+        search_options.setdefault("decision_sampling", ORDERED)
+        search_options.setdefault("widening", DEFAULT_WIDENING)
+        self.search_options = search_options
+        self.processes = []
+        self.connections = []
+        self.num_rounds = 0
+
+    def start(self):
+        for _ in range(self.workers):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_worker, daemon=True,
+                                              args=(child_connection, self.player_is_zombie, self.exploration_constant, self.eps, self.search_options))
+            process.start()
+            child_connection.close()
+            self.processes.append(process)
+            self.connections.append(parent_connection)
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.connections = []
+
+    def start_pondering(self):
+        # The workers keep no tree between turns, so there is nothing to ponder on
+        pass
+
+    def stop_pondering(self):
+        pass
+
+    def decide(self, game_state: GameState, cooldowns):
+        """
+        Same interface as SearchSession.decide
+        """
+        return self.search(PyGameState(game_state, cooldowns, GamePhase.MOVE))
+
+    def search(self, state: PyGameState):
+        if not self.processes:
+            self.start()
+
+        phases = 2 if self.player_is_zombie else 3
+        state_bytes = state.serialize()
+        for worker, connection in enumerate(self.connections):
+            connection.send((state_bytes, (self.seed * 1000003 + worker) * 1009 + state.turn, phases))
+
+        results = [connection.recv() for connection in self.connections]
+        self.num_rounds = sum(num_rounds for num_rounds, _ in results)
+        summary = merge_summaries([worker_summary for _, worker_summary in results])
+        print(f"Workers: {self.workers} \t num rounds: {self.num_rounds}")
+
+        actions = []
+        for _ in range(phases):
+            visited = [entry for entry in summary.values() if entry[1] > 0]
+            if not visited:
+                actions.append([])
+                summary = {}
+                continue
+
+            # Summed visits reward a candidate every worker agreed on over one worker's lucky mean
+            best_actions, _, _, summary = max(visited, key=lambda entry: entry[1])
+            actions.append(best_actions)
+
+        return actions
+
+
+def create_session(player_is_zombie, workers = 1, parallelism = PARALLEL_ROOT, time_manager = None, telemetry_path = None):
+    """
+    The search a strategy keeps for the whole game, a single reusable tree or one of the multi-process searches
+    Only the single tree follows time_manager and writes telemetry, the workers search for their fixed time limit
+    """
+    if workers <= 1:
+        return SearchSession(player_is_zombie, time_manager=time_manager, telemetry_path=telemetry_path)
+    if parallelism == PARALLEL_TREE:
+        return SharedTreeSearch(workers, player_is_zombie)
+    return ParallelSearch(workers, player_is_zombie)
@@ -1,5 +1,9 @@
 from enum import Enum
+from array import array
+from functools import lru_cache
 import copy
+import pickle
+import zlib
 
 from game.game_state import GameState
 
@@ -19,6 +23,12 @@ from game.util.position import Position
 MAX_HEALTH = 10
 ABILITY_COOLDOWN = 6
 STUNNED_DURATION = 1
+BOARD_SIZE = 100
+
+# Terrain types are stored in the board grids as small integer codes, 0 meaning no terrain
+NO_TERRAIN = 0
+TERRAIN_TYPES = [None, TerrainType.WALL, TerrainType.BARRICADE, TerrainType.TREE, TerrainType.RIVER]
+TERRAIN_CODES = dict((terrain_type, code) for code, terrain_type in enumerate(TERRAIN_TYPES) if terrain_type)
 
 class AbilityType(Enum):
     BUILD_BARRICADE = "BUILD_BARRICADE"
@@ -30,6 +40,8 @@ class GamePhase(Enum):
     MOVE = "MOVE"
     ATTACK = "ATTACK"
     ABILITY = "ABILITY",
+
+PHASE_CODES = dict((phase, code) for code, phase in enumerate(GamePhase))
     
 class_stats = {
     CharacterClassType.NORMAL: {
@@ -90,25 +102,258 @@ class_stats = {
     
 }
 
+HASH_MASK = (1 << 64) - 1
+
+# Feature tags mixed into every Zobrist key so different features never share keys
+ZOBRIST_CHARACTER = 1
+ZOBRIST_TERRAIN = 2
+ZOBRIST_PHASE = 3
+ZOBRIST_TURN = 4
+
+def splitmix64(value):
+    value = (value + 0x9E3779B97F4A7C15) & HASH_MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & HASH_MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & HASH_MASK
+    return value ^ (value >> 31)
+
+@lru_cache(maxsize=None)
+def zobrist_key(*parts):
+    # Derived from the parts rather than drawn at random so every process agrees on the keys
+    key = 0
+    for part in parts:
+        key = splitmix64(key ^ (part & HASH_MASK))
+    return key
+
+def character_hash(table, slot):
+    seed = table.zobrist_seeds[slot]
+    return (zobrist_key(ZOBRIST_CHARACTER, seed, 0, table.tile[slot])
+            ^ zobrist_key(ZOBRIST_CHARACTER, seed, 1, table.is_zombie[slot])
+            ^ zobrist_key(ZOBRIST_CHARACTER, seed, 2, table.health[slot])
+            ^ zobrist_key(ZOBRIST_CHARACTER, seed, 3, table.stunned_effect_left[slot])
+            ^ zobrist_key(ZOBRIST_CHARACTER, seed, 4, table.attack_cooldown_left[slot])
+            ^ zobrist_key(ZOBRIST_CHARACTER, seed, 5, table.ability_cooldown_left[slot]))
+
+def terrain_hash(index, terrain_code, health):
+    if terrain_code == NO_TERRAIN:
+        return 0
+    return zobrist_key(ZOBRIST_TERRAIN, index, terrain_code, health)
+
 def position_to_id(position: Position):
     return f"({position.x}, {position.y})"
 
 def add_positions(p1, p2):
     return Position(p1.x+p2.x, p1.y+p2.y)
 
+def position_to_index(position: Position):
+    return position.y * BOARD_SIZE + position.x
+
+def index_to_position(index: int):
+    return Position(index % BOARD_SIZE, index // BOARD_SIZE)
+
+def build_neighbor_table(directions):
+    table = []
+    for index in range(BOARD_SIZE * BOARD_SIZE):
+        x, y = index % BOARD_SIZE, index // BOARD_SIZE
+        table.append(tuple((y + dy) * BOARD_SIZE + x + dx for dx, dy in directions if 0 <= x + dx < BOARD_SIZE and 0 <= y + dy < BOARD_SIZE))
+    return table
+
+# In-bounds neighbours of every flat tile index, edges already masked out
+ORTHOGONAL_NEIGHBORS = build_neighbor_table([(0, 1), (0, -1), (1, 0), (-1, 0)])
+ALL_NEIGHBORS = build_neighbor_table([(1, 1), (1, -1), (-1, 1), (-1, -1), (0, 1), (0, -1), (1, 0), (-1, 0)])
+
+# Bitboards hold one bit per tile at the tile's flat index, the edge masks stop shifts wrapping around a row
+BOARD_BITS = (1 << (BOARD_SIZE * BOARD_SIZE)) - 1
+FIRST_COLUMN_BITS = sum(1 << (y * BOARD_SIZE) for y in range(BOARD_SIZE))
+NOT_FIRST_COLUMN = BOARD_BITS & ~FIRST_COLUMN_BITS
+NOT_LAST_COLUMN = BOARD_BITS & ~(FIRST_COLUMN_BITS << (BOARD_SIZE - 1))
+
+def expand_bits(bits):
+    """
+    Every tile orthogonally next to a tile in bits, plus the tiles themselves
+    """
+    return (bits | ((bits << 1) & NOT_FIRST_COLUMN) | ((bits >> 1) & NOT_LAST_COLUMN)
+            | ((bits << BOARD_SIZE) & BOARD_BITS) | (bits >> BOARD_SIZE))
+
+def flood_fill_bits(start, free, steps):
+    """
+    Tiles reachable from the start bits in at most steps orthogonal moves through the free bits, one ring per expansion
+    """
+    reached = start
+    for _ in range(steps):
+        expanded = expand_bits(reached) & free | reached
+        if expanded == reached:
+            break
+        reached = expanded
+    return reached
+
+def bits_to_indices(bits):
+    indices = []
+    while bits:
+        lowest = bits & -bits
+        indices.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return indices
+
+class Stencil:
+    """
+    Every tile offset within a fixed range of a character, ordered by distance, with each offset's neighbours inside the stencil
+    """
+
+    def __init__(self, radius, diagonal):
+        offsets = [(dx, dy) for dy in range(-radius, radius + 1) for dx in range(-radius, radius + 1)
+                   if (max(abs(dx), abs(dy)) if diagonal else abs(dx) + abs(dy)) <= radius]
+        offsets.sort(key=lambda offset: max(abs(offset[0]), abs(offset[1])) if diagonal else abs(offset[0]) + abs(offset[1]))
+        entries = dict((offset, entry) for entry, offset in enumerate(offsets))
+        directions = [(1, 1), (1, -1), (-1, 1), (-1, -1), (0, 1), (0, -1), (1, 0), (-1, 0)] if diagonal else [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+        self.radius = radius
+        # Entries closer than the radius form a prefix, only terrain on them can hide other entries
+        self.inner_count = sum(1 for dx, dy in offsets if (max(abs(dx), abs(dy)) if diagonal else abs(dx) + abs(dy)) < radius)
+        self.dx = [dx for dx, dy in offsets]
+        self.dy = [dy for dx, dy in offsets]
+        self.flat_offsets = [dy * BOARD_SIZE + dx for dx, dy in offsets]
+        self.neighbors = [tuple(entries[(dx + ddx, dy + ddy)] for ddx, ddy in directions if (dx + ddx, dy + ddy) in entries) for dx, dy in offsets]
+
+
+def build_stencils(range_stat, diagonal_for_zombies):
+    return dict((class_type, Stencil(stats[range_stat], diagonal_for_zombies and class_type == CharacterClassType.ZOMBIE)) for class_type, stats in class_stats.items())
+
+# Attacks reach diagonally for zombies only, heals and barricades always use the orthogonal diamond
+ATTACK_STENCILS = build_stencils("Attack_Range", True)
+ABILITY_STENCILS = build_stencils("Attack_Range", False)
+# Moves never go diagonal, traceurs climbing barricades still need the full search
+MOVE_STENCILS = build_stencils("Move_Speed", False)
+
+# Ways PyGameState.get_possible_move_actions can find reachable tiles
+MOVEGEN_SEARCH = "search"
+MOVEGEN_BITBOARD = "bitboard"
+
+# Built-in policies for PyGameState.playout
+PLAYOUT_GREEDY = "greedy"
+PLAYOUT_RANDOM = "random"
+
+
+CLASS_TYPES = list(CharacterClassType)
+CLASS_CODES = dict((class_type, code) for code, class_type in enumerate(CLASS_TYPES))
+
+
+class CharacterTable:
+    """
+    Struct-of-arrays storage for every character of a state, one typed array per field indexed by slot
+
+    Clones share the arrays until either side writes, so cloning all characters is a handful of buffer copies
+    """
+
+    FIELDS = ("tile", "is_zombie", "class_code", "health", "stunned_effect_left", "attack_cooldown_left", "ability_cooldown_left")
+
+    def __init__(self, characters: list[Character], cooldowns: dict[str, tuple[int, int]]):
+        self.ids = [character.id for character in characters]
+        self.zobrist_seeds = [zlib.crc32(character.id.encode()) for character in characters]
+        self.tile = array("h", [position_to_index(character.position) for character in characters])
+        self.is_zombie = array("b", [character.is_zombie for character in characters])
+        self.class_code = array("b", [CLASS_CODES[character.class_type] for character in characters])
+        self.health = array("b", [character.health for character in characters])
+        self.stunned_effect_left = array("b", [2 if character.is_stunned else 0 for character in characters])
+        self.attack_cooldown_left = array("b", [cooldowns[character.id][0] for character in characters])
+        self.ability_cooldown_left = array("b", [cooldowns[character.id][1] for character in characters])
+        self.owns_arrays = True
+
+    def clone(self):
+        new_table = copy.copy(self)
+        new_table.owns_arrays = self.owns_arrays = False
+        return new_table
+
+    def to_bytes(self):
+        return [getattr(self, field).tobytes() for field in self.FIELDS]
+
+    @classmethod
+    def from_bytes(cls, ids, field_bytes):
+        table = cls.__new__(cls)
+        table.ids = ids
+        table.zobrist_seeds = [zlib.crc32(id.encode()) for id in ids]
+        for field, data in zip(cls.FIELDS, field_bytes):
+            values = array("h" if field == "tile" else "b")
+            values.frombytes(data)
+            setattr(table, field, values)
+        table.owns_arrays = True
+        return table
+
+    def own_arrays(self):
+        if self.owns_arrays:
+            return
+
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field)[:])
+        self.owns_arrays = True
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def table_field(field):
+    # Writes go through the owning state, the table's arrays may be shared with clones
+    return property(lambda self: getattr(self.table, field)[self.slot],
+                    lambda self, value: self.state.write_character(self.slot, field, value))
+
+def class_stat(stat):
+    return property(lambda self: class_stats[CLASS_TYPES[self.table.class_code[self.slot]]][stat])
+
+
 class CharacterState:
-    def __init__(self, character: Character, cooldowns: tuple[int, int]):
-        self.id = character.id
-        self.position = character.position
-        self.is_zombie = character.is_zombie
-        self.class_type = character.class_type
-        self.health = character.health
-        self.move_speed = class_stats[self.class_type]["Move_Speed"]
-        self.attack_range = class_stats[self.class_type]["Attack_Range"]
-        self.ability = class_stats[self.class_type]["Ability"]
-        self.stunned_effect_left = 2 if character.is_stunned else 0
-        self.attack_cooldown_left = cooldowns[0]
-        self.ability_cooldown_left = cooldowns[1]
+    """
+    View of one slot of a CharacterTable, reads come straight from the table and writes go through the state it belongs to
+    """
+
+    __slots__ = ("table", "slot", "state")
+
+    def __init__(self, table: CharacterTable, slot: int, state: "PyGameState"):
+        self.table = table
+        self.slot = slot
+        self.state = state
+
+    tile = table_field("tile")
+    health = table_field("health")
+    stunned_effect_left = table_field("stunned_effect_left")
+    attack_cooldown_left = table_field("attack_cooldown_left")
+    ability_cooldown_left = table_field("ability_cooldown_left")
+
+    move_speed = class_stat("Move_Speed")
+    attack_range = class_stat("Attack_Range")
+    attack_cooldown = class_stat("Attack_Cooldown")
+    ability = class_stat("Ability")
+
+    @property
+    def id(self):
+        return self.table.ids[self.slot]
+
+    @property
+    def zobrist_seed(self):
+        return self.table.zobrist_seeds[self.slot]
+
+    @property
+    def position(self):
+        return index_to_position(self.table.tile[self.slot])
+
+    @position.setter
+    def position(self, position):
+        # Through the state so the occupancy grids follow the character
+        self.state.move_character(self, position)
+
+    @property
+    def is_zombie(self):
+        return self.table.is_zombie[self.slot] == 1
+
+    @is_zombie.setter
+    def is_zombie(self, is_zombie):
+        self.state.write_character(self.slot, "is_zombie", 1 if is_zombie else 0)
+
+    @property
+    def class_type(self):
+        return CLASS_TYPES[self.table.class_code[self.slot]]
+
+    @class_type.setter
+    def class_type(self, class_type):
+        self.state.write_character(self.slot, "class_code", CLASS_CODES[class_type])
 
     def get_id(self):
         return self.id
@@ -159,18 +404,13 @@ class CharacterState:
             self.stunned_effect_left -= 1
         
     def make_zombie(self):
-        self.is_zombie = True
-        self.class_type = CharacterClassType.ZOMBIE
-        self.move_speed = 5
-        self.attack_range = 1
-        self.ability = None
-        
-    def clear_actions(self):
-        self.attack_action = None
-        self.ability_action = None
+        # Through the state so the zombie count, scores and zombie occupancy follow
+        self.state.make_zombie(self)
 
 
 class TerrainState:
+    __slots__ = ("id", "position", "health", "can_attack_through", "terrain_type")
+
     def __init__(self, terrain: Terrain|None, id = None, position = None, health = None, can_attack_through = None, type = None):
         if terrain:
             self.id = terrain.id
@@ -198,15 +438,263 @@ class TerrainState:
     def is_destroyable(self):
         return self.health >= 0
 
-    def can_attack_through(self):
-        return self.can_attack_through
-
     def is_destroyed(self):
         return self.health == 0
 
 
+# Marks a dict key that did not exist before a write, undo deletes it again
+MISSING = object()
+
+
+class UndoRecord:
+    """
+    Journal of the values overwritten while PyGameState.apply ran, replayed backwards by restore
+
+    Entries name the grid and character slot they belong to rather than holding on to the containers,
+    so a state cloned in between still gets its own copies restored
+    """
+
+    def __init__(self, state):
+        self.turn = state.turn
+        self.phase = state.phase
+        self.zombies_count = state.zombies_count
+        self.scores = state.scores
+        self.character_hash = state.character_hash
+        self.terrain_hash = state.board.terrain_hash
+        self.terrain_bits = state.board.terrain_bits
+        self.board_entries = []
+        self.character_entries = {}
+
+    def record(self, board, grid, key):
+        self.board_entries.append((grid, key, getattr(board, grid)[key]))
+
+    def record_character(self, table, slot):
+        if slot not in self.character_entries:
+            self.character_entries[slot] = [getattr(table, field)[slot] for field in CharacterTable.FIELDS]
+
+    def record_terrain(self, board, index, id):
+        self.record(board, "terrain_type", index)
+        self.record(board, "terrain_health", index)
+        self.record(board, "terrain_attack_through", index)
+        self.record(board, "terrain_ids", index)
+        self.board_entries.append(("terrain_indices", id, board.terrain_indices.get(id, MISSING)))
+
+    def record_occupancy(self, board, index):
+        self.record(board, "occupancy", index)
+        self.record(board, "zombie_occupancy", index)
+        self.record(board, "character_slot", index)
+
+    def restore(self, state):
+        board = state.board
+        if self.board_entries:
+            board.own_terrain()
+            board.own_occupancy()
+
+        for grid, key, value in reversed(self.board_entries):
+            if value is MISSING:
+                del getattr(board, grid)[key]
+            else:
+                getattr(board, grid)[key] = value
+
+        if self.character_entries:
+            state.characters.own_arrays()
+
+        for slot, values in self.character_entries.items():
+            for field, value in zip(CharacterTable.FIELDS, values):
+                getattr(state.characters, field)[slot] = value
+
+        state.dirty_slots.clear()
+        state.character_hash = self.character_hash
+        board.terrain_hash = self.terrain_hash
+        board.terrain_bits = self.terrain_bits
+        state.turn = self.turn
+        state.phase = self.phase
+        state.zombies_count = self.zombies_count
+        state.scores = self.scores
+
+
+class Board:
+    """
+    Dense grids describing every tile of the map, indexed by y * BOARD_SIZE + x
+
+    Terrain and occupancy grids are shared between a board and its clones and only copied on first write
+
+    Characters sharing a tile form a linked list, character_slot holds the first slot on each tile and
+    next_slot links every slot to the one below it
+
+    terrain_bits holds a bitboard of the standing terrain of each type, indexed by terrain code. It is only built
+    once bitboard move generation asks for it and kept up to date from then on, None until then
+    """
+
+    def __init__(self):
+        tiles = BOARD_SIZE * BOARD_SIZE
+        self.terrain_type = array("b", bytes(tiles))
+        self.terrain_health = array("h", [0]) * tiles
+        self.terrain_attack_through = array("b", bytes(tiles))
+        self.terrain_ids = [None] * tiles
+        self.terrain_indices: dict[str, int] = {}
+        self.occupancy = array("b", bytes(tiles))
+        self.zombie_occupancy = array("b", bytes(tiles))
+        self.character_slot = array("h", [-1]) * tiles
+        self.next_slot = array("h")
+        self.terrain_hash = 0
+        self.terrain_bits: tuple | None = None
+        self.owns_terrain = True
+        self.owns_occupancy = True
+        self.journal: UndoRecord | None = None
+
+    def clone(self):
+        new_board = copy.copy(self)
+        new_board.journal = None
+        new_board.owns_terrain = self.owns_terrain = False
+        new_board.owns_occupancy = self.owns_occupancy = False
+        return new_board
+
+    def own_terrain(self):
+        if self.owns_terrain:
+            return
+
+        self.terrain_type = self.terrain_type[:]
+        self.terrain_health = self.terrain_health[:]
+        self.terrain_attack_through = self.terrain_attack_through[:]
+        self.terrain_ids = self.terrain_ids[:]
+        self.terrain_indices = self.terrain_indices.copy()
+        self.owns_terrain = True
+
+    def own_occupancy(self):
+        if self.owns_occupancy:
+            return
+
+        self.occupancy = self.occupancy[:]
+        self.zombie_occupancy = self.zombie_occupancy[:]
+        self.character_slot = self.character_slot[:]
+        self.next_slot = self.next_slot[:]
+        self.owns_occupancy = True
+
+    def set_terrain(self, index, id, terrain_type, health, can_attack_through):
+        self.own_terrain()
+        if self.journal is not None:
+            self.journal.record_terrain(self, index, id)
+        self.terrain_hash ^= terrain_hash(index, self.terrain_type[index], self.terrain_health[index])
+        self.set_terrain_bit(index, self.terrain_type[index], False)
+        self.terrain_type[index] = TERRAIN_CODES[terrain_type]
+        self.terrain_health[index] = health
+        self.terrain_hash ^= terrain_hash(index, self.terrain_type[index], health)
+        self.set_terrain_bit(index, self.terrain_type[index], health != 0)
+        self.terrain_attack_through[index] = 1 if can_attack_through else 0
+        self.terrain_ids[index] = id
+        self.terrain_indices[id] = index
+
+    def has_terrain(self, index):
+        return self.terrain_type[index] != NO_TERRAIN
+
+    def get_terrain_type(self, index):
+        return TERRAIN_TYPES[self.terrain_type[index]]
+
+    def is_terrain_destroyed(self, index):
+        return self.terrain_health[index] == 0
+
+    def damage_terrain(self, index):
+        if self.terrain_health[index] > 0:
+            self.own_terrain()
+            if self.journal is not None:
+                self.journal.record(self, "terrain_health", index)
+            self.set_terrain_health(index, self.terrain_health[index] - 1)
+
+    def destroy_terrain(self, index):
+        if self.terrain_health[index] != 0:
+            self.own_terrain()
+            if self.journal is not None:
+                self.journal.record(self, "terrain_health", index)
+            self.set_terrain_health(index, 0)
+
+    def set_terrain_health(self, index, health):
+        terrain_code = self.terrain_type[index]
+        self.terrain_hash ^= terrain_hash(index, terrain_code, self.terrain_health[index]) ^ terrain_hash(index, terrain_code, health)
+        self.terrain_health[index] = health
+        self.set_terrain_bit(index, terrain_code, health != 0)
+
+    def set_terrain_bit(self, index, terrain_code, is_standing):
+        if terrain_code == NO_TERRAIN or self.terrain_bits is None:
+            return
+
+        bits = self.terrain_bits[terrain_code]
+        new_bits = bits | (1 << index) if is_standing else bits & ~(1 << index)
+        if new_bits != bits:
+            self.terrain_bits = self.terrain_bits[:terrain_code] + (new_bits,) + self.terrain_bits[terrain_code + 1:]
+
+    def get_terrain_bits(self):
+        if self.terrain_bits is None:
+            # Set in byte buffers and converted once, rather than one big int operation per terrain
+            buffers = [bytearray((BOARD_SIZE * BOARD_SIZE + 7) // 8) for _ in TERRAIN_TYPES]
+            for index in self.terrain_indices.values():
+                if self.terrain_health[index] != 0:
+                    buffers[self.terrain_type[index]][index >> 3] |= 1 << (index & 7)
+            buffers[NO_TERRAIN] = bytearray()
+            self.terrain_bits = tuple(int.from_bytes(buffer, "little") for buffer in buffers)
+        return self.terrain_bits
+
+    def get_blocking_bits(self, ignore_barricades):
+        """
+        Bitboard of the tiles standing terrain keeps moves out of
+        """
+        blocking = 0
+        for terrain_code, bits in enumerate(self.get_terrain_bits()):
+            if not (ignore_barricades and terrain_code == TERRAIN_CODES[TerrainType.BARRICADE]):
+                blocking |= bits
+        return blocking
+
+    def reserve_characters(self, count):
+        self.own_occupancy()
+        self.next_slot = array("h", [-1]) * count
+
+    def add_character(self, index, slot, is_zombie):
+        self.own_occupancy()
+        if self.journal is not None:
+            self.journal.record_occupancy(self, index)
+            self.journal.record(self, "next_slot", slot)
+        self.occupancy[index] += 1
+        if is_zombie:
+            self.zombie_occupancy[index] += 1
+        self.next_slot[slot] = self.character_slot[index]
+        self.character_slot[index] = slot
+
+    def remove_character(self, index, slot, is_zombie):
+        self.own_occupancy()
+        if self.journal is not None:
+            self.journal.record_occupancy(self, index)
+        self.occupancy[index] -= 1
+        if is_zombie:
+            self.zombie_occupancy[index] -= 1
+
+        if self.character_slot[index] == slot:
+            self.character_slot[index] = self.next_slot[slot]
+            return
+
+        above = self.character_slot[index]
+        while self.next_slot[above] != slot:
+            above = self.next_slot[above]
+        if self.journal is not None:
+            self.journal.record(self, "next_slot", above)
+        self.next_slot[above] = self.next_slot[slot]
+
+    def convert_to_zombie(self, index):
+        self.own_occupancy()
+        if self.journal is not None:
+            self.journal.record(self, "zombie_occupancy", index)
+        self.zombie_occupancy[index] += 1
+
+    def get_slots_at(self, index):
+        slots = []
+        slot = self.character_slot[index]
+        while slot != -1:
+            slots.append(slot)
+            slot = self.next_slot[slot]
+        return slots
+
+
 class PyGameState:
-    BOARD_SIZE = 100
+    BOARD_SIZE = BOARD_SIZE
     TURNS = 200
     STARTING_ZOMBIES = 5
 
@@ -215,9 +703,148 @@ class PyGameState:
 
     def __init__(self, game_state: GameState, cooldowns: dict[str, tuple[int, int]], game_phase: GamePhase):
         self.turn: int = game_state.turn
-        self.character_states = dict((character.id, CharacterState(character, cooldowns[character.id])) for character in game_state.characters.values())
-        self.terrain_states = dict((terrain.id, TerrainState(terrain)) for terrain in game_state.terrains.values())
         self.phase = game_phase
+        self.board = Board()
+        self.characters = CharacterTable(list(game_state.characters.values()), cooldowns)
+
+        for terrain in game_state.terrains.values():
+            self.board.set_terrain(position_to_index(terrain.position), terrain.id, terrain.type, terrain.health, terrain.can_attack_through)
+
+        self.move_generation = MOVEGEN_SEARCH
+        self.place_characters()
+
+    def place_characters(self):
+        """
+        Builds everything derived from the character table and board: the id index, occupancy, counts and hashes
+        """
+        self.slots_by_id = dict((id, slot) for slot, id in enumerate(self.characters.ids))
+        self.views = None
+        # Kept up to date by make_zombie and advance_turn so the search never rescans the characters
+        self.zombies_count = sum(self.characters.is_zombie)
+        self.scores = self.compute_scores()
+
+        self.board.reserve_characters(len(self.character_list))
+        for character_state in self.character_list:
+            self.place_character(character_state)
+
+        self.journal: UndoRecord | None = None
+
+        # Characters being written to have their keys taken out of character_hash until rehash_characters puts them back
+        self.character_hash = 0
+        self.dirty_slots = set()
+        for slot in range(len(self.characters)):
+            self.character_hash ^= character_hash(self.characters, slot)
+
+    def serialize(self) -> bytes:
+        """
+        Compact snapshot for sending the state to another process, the character arrays go as raw bytes and terrain as a sparse list
+        """
+        board = self.board
+        terrains = [(index, board.terrain_ids[index], terrain_code, board.terrain_health[index], board.terrain_attack_through[index])
+                    for index, terrain_code in enumerate(board.terrain_type) if terrain_code != NO_TERRAIN]
+        return pickle.dumps((self.turn, PHASE_CODES[self.phase], self.move_generation, self.characters.ids, self.characters.to_bytes(), terrains),
+                            pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "PyGameState":
+        turn, phase_code, move_generation, ids, field_bytes, terrains = pickle.loads(data)
+
+        state = cls.__new__(cls)
+        state.turn = turn
+        state.phase = list(GamePhase)[phase_code]
+        state.board = Board()
+        state.characters = CharacterTable.from_bytes(ids, field_bytes)
+
+        for index, id, terrain_code, health, can_attack_through in terrains:
+            state.board.set_terrain(index, id, TERRAIN_TYPES[terrain_code], health, can_attack_through)
+
+        state.move_generation = move_generation
+        state.place_characters()
+        return state
+
+    def clone(self):
+        """
+        Structural-sharing copy, characters and board grids are shared until either state writes to them
+        """
+        new_state = copy.copy(self)
+        new_state.board = self.board.clone()
+        new_state.characters = self.characters.clone()
+        new_state.views = None
+        new_state.dirty_slots = set()
+        return new_state
+
+    @property
+    def character_list(self) -> list[CharacterState]:
+        # Views are bound to this state's table, so they are built on first use rather than on every clone
+        if self.views is None:
+            self.views = [CharacterState(self.characters, slot, self) for slot in range(len(self.characters))]
+        return self.views
+
+    @property
+    def character_states(self) -> dict[str, CharacterState]:
+        return dict(zip(self.characters.ids, self.character_list))
+
+    def get_character_state(self, id) -> CharacterState:
+        return self.character_list[self.slots_by_id[id]]
+
+    def get_writable_character_state(self, id):
+        slot = self.slots_by_id[id]
+        self.make_slot_writable(slot)
+        return self.character_list[slot]
+
+    def make_slot_writable(self, slot):
+        self.characters.own_arrays()
+
+        if self.journal is not None:
+            self.journal.record_character(self.characters, slot)
+
+        if slot not in self.dirty_slots:
+            self.dirty_slots.add(slot)
+            self.character_hash ^= character_hash(self.characters, slot)
+
+    def write_character(self, slot, field, value):
+        """
+        Sets one field of a character, slots made writable by the engine are rehashed at the end of the phase,
+        any other write keeps the hash correct straight away
+        """
+        if slot in self.dirty_slots:
+            getattr(self.characters, field)[slot] = value
+            return
+
+        self.make_slot_writable(slot)
+        getattr(self.characters, field)[slot] = value
+        self.dirty_slots.discard(slot)
+        self.character_hash ^= character_hash(self.characters, slot)
+
+    def rehash_characters(self):
+        for slot in self.dirty_slots:
+            self.character_hash ^= character_hash(self.characters, slot)
+        self.dirty_slots.clear()
+
+    def get_hash(self):
+        """
+        64 bit Zobrist hash of everything the simulation tracks, equal states always hash the same
+        """
+        return (self.character_hash ^ self.board.terrain_hash
+                ^ zobrist_key(ZOBRIST_PHASE, PHASE_CODES[self.phase])
+                ^ zobrist_key(ZOBRIST_TURN, self.turn))
+
+    def compute_hash(self):
+        """
+        Recomputes the hash from scratch, only meant for checking the incremental one
+        """
+        board = self.board
+        state_hash = zobrist_key(ZOBRIST_PHASE, PHASE_CODES[self.phase]) ^ zobrist_key(ZOBRIST_TURN, self.turn)
+        for slot in range(len(self.characters)):
+            state_hash ^= character_hash(self.characters, slot)
+        for index in board.terrain_indices.values():
+            state_hash ^= terrain_hash(index, board.terrain_type[index], board.terrain_health[index])
+        return state_hash
+
+    @property
+    def terrain_states(self):
+        board = self.board
+        return dict((board.terrain_ids[index], self.get_terrain_state_at_index(index)) for index in board.terrain_indices.values())
 
     def get_character_states(self):
         return self.character_states
@@ -232,12 +859,11 @@ class PyGameState:
         return True if self.turn % 2 == 1 else False
 
     def run_turn(self, move_actions: list[MoveAction], attack_actions: list[AttackAction], ability_actions: list[AbilityAction]) -> GameState:
-        new_state = copy.deepcopy(self)
-        new_state.turn += 1
+        new_state = self.clone()
+        new_state.advance_turn()
 
         is_zombie_turn = new_state.get_is_zombie_turn()
 
-        new_state.apply_clear_actions(new_state.character_states)
         new_state.apply_move_actions(move_actions)
 
         new_state.apply_attack_actions(attack_actions)
@@ -248,52 +874,176 @@ class PyGameState:
         return new_state
     
     def run_actions(self, actions) -> GameState:
-        if self.phase == GamePhase.MOVE:
-            return self.run_move(actions)
-        
-        if self.phase == GamePhase.ATTACK:
-            return self.run_attack(actions)
-        
-        if self.phase == GamePhase.ABILITY:
-            return self.run_ability(actions)
+        new_state = self.clone()
+        new_state.advance(actions)
+        return new_state
     
     def run_move(self, move_actions: list[MoveAction]) -> GameState:
-        new_state = copy.deepcopy(self)
-
-        new_state.apply_clear_actions(new_state.character_states)
-        new_state.apply_move_actions(move_actions)
-        
-        self.phase = GamePhase.ATTACK
-        
+        new_state = self.clone()
+        new_state.advance_move(move_actions)
         return new_state
     
     def run_attack(self, attack_actions: list[AttackAction]) -> GameState:
-        new_state = copy.deepcopy(self)
+        new_state = self.clone()
+        new_state.advance_attack(attack_actions)
+        return new_state
+    
+    def run_ability(self, ability_actions: list[AbilityAction]) -> GameState:
+        new_state = self.clone()
+        new_state.advance_ability(ability_actions)
+        return new_state
 
-        is_zombie_turn = new_state.get_is_zombie_turn()
+    def advance(self, actions):
+        if self.phase == GamePhase.MOVE:
+            self.advance_move(actions)
+        
+        elif self.phase == GamePhase.ATTACK:
+            self.advance_attack(actions)
+        
+        elif self.phase == GamePhase.ABILITY:
+            self.advance_ability(actions)
 
-        # new_state.apply_attack_actions(attack_actions)
-        new_state.apply_cooldown_and_effect_decay(is_zombie_turn)
+    def advance_move(self, move_actions: list[MoveAction]):
+        self.apply_move_actions(move_actions)
         
-        self.phase = GamePhase.MOVE if self.get_is_zombie_turn() else GamePhase.ABILITY
+        self.phase = GamePhase.ATTACK
+
+    def advance_attack(self, attack_actions: list[AttackAction]):
+        is_zombie_turn = self.get_is_zombie_turn()
+
+        self.apply_attack_actions(attack_actions)
+        self.apply_cooldown_and_effect_decay(is_zombie_turn)
         
-        return new_state
-    
-    def run_ability(self, ability_actions: list[AbilityAction]) -> GameState:
-        new_state = copy.deepcopy(self)
+        if is_zombie_turn:
+            self.phase = GamePhase.MOVE
+            self.advance_turn()
+        else:
+            self.phase = GamePhase.ABILITY
 
-        new_state.apply_ability_actions(ability_actions)
+    def advance_ability(self, ability_actions: list[AbilityAction]):
+        self.apply_ability_actions(ability_actions)
         
         self.phase = GamePhase.MOVE
-        self.turn += 1
-        
-        return new_state
+        self.advance_turn()
+
+    def apply(self, actions) -> "UndoRecord":
+        """
+        Runs the actions for the current phase in place, the returned record lets undo restore the state exactly
+        """
+        record = UndoRecord(self)
+        self.journal = self.board.journal = record
+        try:
+            self.advance(actions)
+        finally:
+            self.journal = self.board.journal = None
+
+        return record
+
+    def undo(self, record: "UndoRecord"):
+        record.restore(self)
+
+    def playout(self, depth, policy, rng) -> list["UndoRecord"]:
+        """
+        Plays up to depth phases in place with a built-in policy, undoing the returned records in reverse restores the state
+        """
+        records = []
+        for _ in range(depth):
+            if self.is_finished():
+                break
+            records.append(self.apply(self.get_playout_actions(policy, rng)))
+
+        return records
+
+    def get_playout_actions(self, policy, rng):
+        """
+        At most one action per character for the current phase, picked without enumerating every possible action
+
+        Greedy chases or flees the closest enemy by manhattan distance and attacks the closest enemy in range,
+        random moves anywhere in range and attacks any enemy in range
+        """
+        is_zombie = self.get_is_zombie_turn()
+
+        if self.phase == GamePhase.MOVE:
+            return self.get_playout_move_actions(is_zombie, policy, rng)
+        if self.phase == GamePhase.ATTACK:
+            return self.get_playout_attack_actions(is_zombie, policy, rng)
+        return self.get_playout_ability_actions(is_zombie)
+
+    def get_playout_move_actions(self, is_zombie, policy, rng):
+        enemies = [(character_state.tile % BOARD_SIZE, character_state.tile // BOARD_SIZE)
+                   for character_state in self.character_list if character_state.is_zombie != is_zombie]
+        # Zombies close the distance, humans open it
+        direction = 1 if is_zombie else -1
+        move_actions = []
+
+        for character_state in self.character_list:
+            if character_state.is_zombie != is_zombie or character_state.is_stunned():
+                continue
+
+            start = character_state.tile
+            if character_state.ability == AbilityType.MOVE_OVER_BARRICADES:
+                tiles = list(self.get_tile_distances(start, character_state.move_speed, False, False, True))
+            else:
+                tiles = self.get_stencil_tiles(MOVE_STENCILS[character_state.class_type], start, False)
+
+            if policy == PLAYOUT_RANDOM or not enemies:
+                tile = rng.choice(tiles)
+            else:
+                x, y = start % BOARD_SIZE, start // BOARD_SIZE
+                enemy_x, enemy_y = min(enemies, key=lambda enemy: abs(enemy[0] - x) + abs(enemy[1] - y))
+                tile = min(tiles, key=lambda tile: direction * (abs(tile % BOARD_SIZE - enemy_x) + abs(tile // BOARD_SIZE - enemy_y)))
+
+            if tile != start:
+                move_actions.append(MoveAction(character_state.id, index_to_position(tile)))
+
+        return move_actions
+
+    def get_playout_attack_actions(self, is_zombie, policy, rng):
+        board = self.board
+        attack_actions = []
+
+        for character_state in self.character_list:
+            if character_state.is_zombie != is_zombie or not character_state.can_attack():
+                continue
+
+            # Stencil tiles come nearest first, so the first target found is the closest one
+            targets = []
+            for index in self.get_stencil_tiles(ATTACK_STENCILS[character_state.class_type], character_state.tile, True):
+                enemy_count = board.occupancy[index] - board.zombie_occupancy[index] if is_zombie else board.zombie_occupancy[index]
+                if enemy_count == 0:
+                    continue
+
+                targets.extend(target for target in self.get_character_states_at_index(index) if self.is_valid_attack(character_state, target))
+                if targets and policy != PLAYOUT_RANDOM:
+                    break
+
+            if targets:
+                target = rng.choice(targets) if policy == PLAYOUT_RANDOM else targets[0]
+                attack_actions.append(AttackAction(character_state.id, target.id, AttackActionType.CHARACTER))
+
+        return attack_actions
+
+    def get_playout_ability_actions(self, is_zombie):
+        ability_actions = []
+
+        for character_state in self.character_list:
+            if character_state.is_zombie != is_zombie or character_state.ability != AbilityType.HEAL or not character_state.can_ability():
+                continue
+
+            # Heal the weakest human in reach, barricades are left to the search
+            patients = [target for index in self.get_stencil_tiles(ABILITY_STENCILS[character_state.class_type], character_state.tile, False)
+                        for target in self.get_character_states_at_index(index) if not target.is_zombie]
+            if patients:
+                patient = min(patients, key=lambda target: target.health)
+                ability_actions.append(AbilityAction(character_state.id, patient.id, None, AbilityActionType.HEAL))
+
+        return ability_actions
 
     def get_zombies_count(self):
-        return sum(1 for character_state in self.character_states.values() if character_state.is_zombie)
+        return self.zombies_count
 
     def get_humans_count(self):
-        return sum(1 for character_state in self.character_states.values() if not character_state.is_zombie)
+        return len(self.characters) - self.zombies_count
 
     def is_finished(self):
         if self.get_humans_count() <= 0:
@@ -302,6 +1052,9 @@ class PyGameState:
         return self.turn >= self.TURNS
 
     def get_scores(self):
+        return self.scores
+
+    def compute_scores(self):
         zombies_count = self.get_zombies_count()
         humans_count = self.get_humans_count()
         humans_infected = zombies_count - self.STARTING_ZOMBIES
@@ -311,50 +1064,84 @@ class PyGameState:
 
         return (humans_score, zombies_score)
 
+    def advance_turn(self):
+        self.turn += 1
+        self.scores = self.compute_scores()
+
     def get_stats(self):
         zombies_count = self.get_zombies_count()
         humans_count = self.get_humans_count()
         return (self.turn, humans_count, zombies_count)
 
-    def apply_clear_actions(self, character_states):
-        for character_state in character_states.values():
-            character_state.clear_actions()
+    def place_character(self, character_state):
+        self.board.add_character(character_state.tile, character_state.slot, character_state.is_zombie)
+
+    def lift_character(self, character_state):
+        self.board.remove_character(character_state.tile, character_state.slot, character_state.is_zombie)
+
+    def make_zombie(self, character_state):
+        if not character_state.is_zombie:
+            self.board.convert_to_zombie(character_state.tile)
+            self.zombies_count += 1
+            self.scores = self.compute_scores()
+        self.write_character(character_state.slot, "is_zombie", 1)
+        self.write_character(character_state.slot, "class_code", CLASS_CODES[CharacterClassType.ZOMBIE])
+
+    def move_character(self, character_state, destination):
+        if character_state.tile == position_to_index(destination):
+            return
+
+        self.lift_character(character_state)
+        self.write_character(character_state.slot, "tile", position_to_index(destination))
+        self.place_character(character_state)
 
     def apply_move_actions(self, move_actions):
         for move_action in move_actions:
             character_id = move_action.executing_character_id
             destination = move_action.destination
 
-            self.character_states[character_id].position = destination
+            self.move_character(self.get_character_state(character_id), destination)
+
+        self.rehash_characters()
 
     def apply_attack_actions(self, attack_actions):
         for attack_action in attack_actions:
             attacker_id = attack_action.executing_character_id
             target_id = attack_action.attacking_id
             attack_type = attack_action.type
+
+            attacker_state = self.get_writable_character_state(attacker_id)
+            attacker_state.reset_attack_cooldown_left()
             
             if attack_type == AttackActionType.CHARACTER:
-                target_state = self.character_states[target_id]
+                target_state = self.get_writable_character_state(target_id)
                 if target_state.is_zombie:
-                    self.character_states[target_id].stun()
+                    target_state.stun()
                 else:
                     target_state.damage()
                     if target_state.is_destroyed():
-                        target_state.make_zombie()
+                        self.make_zombie(target_state)
             else:
-                terrain = self.terrain_states.get(target_id)
-                if terrain and terrain.terrain_type != TerrainType.RIVER:
-                    if self.character_states[attacker_id].ability == AbilityType.ONESHOT_TERRAIN:
-                        terrain.health = 0
+                index = self.board.terrain_indices.get(target_id)
+                if index is not None and self.board.get_terrain_type(index) != TerrainType.RIVER:
+                    if attacker_state.ability == AbilityType.ONESHOT_TERRAIN:
+                        self.board.destroy_terrain(index)
                     else:
-                        terrain.damage()
+                        self.board.damage_terrain(index)
+
+        self.rehash_characters()
 
     def apply_cooldown_and_effect_decay(self, is_zombie):
-        for character_state in self.character_states.values():
+        for character_state in self.character_list:
             if character_state.is_zombie != is_zombie:
                 continue
 
-            character_state.apply_cooldown_and_effect_decay()
+            if character_state.attack_cooldown_left == 0 and character_state.ability_cooldown_left == 0 and character_state.stunned_effect_left == 0:
+                continue
+
+            self.get_writable_character_state(character_state.id).apply_cooldown_and_effect_decay()
+
+        self.rehash_characters()
 
     def apply_ability_actions(self, ability_actions):
         for ability_action in ability_actions:
@@ -362,19 +1149,38 @@ class PyGameState:
             target_id = ability_action.character_id_target
             target_position = ability_action.positional_target
 
+            self.get_writable_character_state(ability_action.executing_character_id).reset_ability_cooldown_left()
+
             if action_type == AbilityActionType.HEAL:
-                self.character_states[target_id].heal()
+                self.get_writable_character_state(target_id).heal()
 
             if action_type == AbilityActionType.BUILD_BARRICADE:
-                barricade = TerrainState(None, position_to_id(target_position), target_position, 1, True, TerrainType.BARRICADE)
-                self.terrain_states.append(barricade)
+                self.board.set_terrain(position_to_index(target_position), position_to_id(target_position), TerrainType.BARRICADE, 1, True)
+
+        self.rehash_characters()
 
+    def get_terrain_state_at_index(self, index):
+        board = self.board
+        if not board.has_terrain(index):
+            return None
+
+        return TerrainState(None, board.terrain_ids[index], index_to_position(index), board.terrain_health[index], board.terrain_attack_through[index] == 1, board.get_terrain_type(index))
 
     def get_terrain_state(self, position):
-        return self.terrain_states.get(position_to_id(position))
+        return self.get_terrain_state_at_index(position_to_index(position))
     
     def get_character_state_at_position(self, position):
-        return self.character_states.get(position_to_id(position))
+        slot = self.board.character_slot[position_to_index(position)]
+        if slot == -1:
+            return None
+
+        return self.character_list[slot]
+
+    def get_character_states_at_index(self, index):
+        return [self.character_list[slot] for slot in self.board.get_slots_at(index)]
+
+    def get_character_states_at_position(self, position):
+        return self.get_character_states_at_index(position_to_index(position))
 
     def is_valid_attack(self, attacker_state, target_state):
         if attacker_state.is_destroyed() or target_state.is_destroyed():
@@ -388,70 +1194,131 @@ class PyGameState:
 
         return True
     
-    def get_blocking_terrain(self, pos, ignore_barricades):
-        blocking = self.get_terrain_state(pos)
-        
-        if blocking == None:
-            return None
+    def is_blocking_terrain(self, index, ignore_barricades):
+        board = self.board
+        if not board.has_terrain(index) or board.is_terrain_destroyed(index):
+            return False
+
+        if ignore_barricades and board.terrain_type[index] == TERRAIN_CODES[TerrainType.BARRICADE]:
+            return False
 
-        if blocking.is_destroyed():
-            blocking = None
+        return True
 
-        if ignore_barricades and blocking.terrain_type == TerrainType.BARRICADE:
-            blocking = None
+    def get_blocking_terrain(self, pos, ignore_barricades):
+        index = position_to_index(pos)
+        if not self.is_blocking_terrain(index, ignore_barricades):
+            return None
 
-        return blocking
+        return self.get_terrain_state_at_index(index)
     
     def in_bounds(self, pos):
         return (0 <= pos.x < self.BOARD_SIZE) and (0 <= pos.y < self.BOARD_SIZE)
 
     def can_traverse_through(self, pos, is_attack, ignore_barricades):
-        if not pos.in_bounds():
+        if not self.in_bounds(pos):
             return False
 
-        blocking = self.get_blocking_terrain(pos, ignore_barricades and is_attack)
+        return self.is_passable(position_to_index(pos), is_attack, ignore_barricades)
 
-        if blocking is not None:
-            if is_attack and blocking.can_attack_through():
-                return True
-            return False
+    def is_passable(self, index, is_attack, ignore_barricades):
+        if self.is_blocking_terrain(index, ignore_barricades and not is_attack):
+            return is_attack and self.board.terrain_attack_through[index] == 1
 
         return True
 
-    def get_tiles_in_range(self, start, range, diagonal, is_attack, ignore_barricades, searched = []) -> dict[Position]:
-        moves: dict = {}
+    def get_tile_distances(self, start, max_distance, diagonal, is_attack, ignore_barricades) -> dict[int, int]:
+        """
+        Breadth-first search from the flat tile index start, mapping every tile reachable within max_distance to its distance
 
-        if range < 0:
-            return moves
+        Moves only enter passable tiles, attacks also reach blocking tiles but never see past them
+        """
+        distances = {start: 0}
 
-        can_traverse_through_start = self.can_traverse_through(start, is_attack, ignore_barricades)
-        moves[position_to_id(start)] = start
+        if max_distance <= 0 or not self.is_passable(start, is_attack, ignore_barricades):
+            return distances
 
-        if range == 0 or not can_traverse_through_start:
-            return moves
+        neighbors = ALL_NEIGHBORS if diagonal else ORTHOGONAL_NEIGHBORS
+        frontier = [start]
 
-        directions = self.DIAGONAL_DIRECTIONS+self.DIRECTIONS if diagonal else self.DIRECTIONS
+        for distance in range(1, max_distance + 1):
+            next_frontier = []
+            for index in frontier:
+                for neighbor in neighbors[index]:
+                    if neighbor in distances:
+                        continue
 
-        for direction in directions:
-            new_position = add_positions(start, direction)
-            if position_to_id(new_position) in searched:
-                continue
+                    if self.is_passable(neighbor, is_attack, ignore_barricades):
+                        distances[neighbor] = distance
+                        next_frontier.append(neighbor)
+                    elif is_attack:
+                        distances[neighbor] = distance
 
-            if not is_attack:
-                can_traverse = self.can_traverse_through(new_position, is_attack, ignore_barricades)
+            frontier = next_frontier
 
-                if not can_traverse:
-                    continue
+        return distances
+
+    def get_tiles_in_range(self, start, range, diagonal, is_attack, ignore_barricades) -> dict[int, Position]:
+        if not self.in_bounds(start):
+            return {}
 
-            moves[position_to_id(new_position)] = new_position
-            moves.update(self.get_tiles_in_range(new_position, range - 1, diagonal, is_attack, ignore_barricades, moves))
+        distances = self.get_tile_distances(position_to_index(start), range, diagonal, is_attack, ignore_barricades)
+        return dict((index, index_to_position(index)) for index in distances)
 
-        return moves
+    def get_stencil_tiles(self, stencil: Stencil, start, is_attack) -> list[int]:
+        """
+        Flat indices of the stencil around start that terrain leaves reachable, same answer as get_tile_distances
+
+        Blocking tiles are found for the whole stencil in one pass, the search only runs when one of them is in the way
+        """
+        x, y = start % BOARD_SIZE, start // BOARD_SIZE
+        radius = stencil.radius
+        if radius <= x < BOARD_SIZE - radius and radius <= y < BOARD_SIZE - radius:
+            tiles = [start + offset for offset in stencil.flat_offsets]
+        else:
+            tiles = [start + offset if 0 <= x + dx < BOARD_SIZE and 0 <= y + dy < BOARD_SIZE else -1
+                     for offset, dx, dy in zip(stencil.flat_offsets, stencil.dx, stencil.dy)]
+
+        board = self.board
+        terrain_type, terrain_health, terrain_attack_through = board.terrain_type, board.terrain_health, board.terrain_attack_through
+        blocked = [tile != -1 and terrain_type[tile] != NO_TERRAIN and terrain_health[tile] != 0 and not (is_attack and terrain_attack_through[tile])
+                   for tile in tiles]
+
+        # The board is convex, so tiles off the edge never hide a tile that is on it
+        if not any(blocked[:stencil.inner_count]):
+            if is_attack:
+                return [tile for tile in tiles if tile != -1]
+            return [tile for tile, is_blocked in zip(tiles, blocked) if tile != -1 and not is_blocked]
+
+        if blocked[0]:
+            return [start]
+
+        reached = [False] * len(tiles)
+        reached[0] = True
+        frontier = [0]
+        for _ in range(radius):
+            next_frontier = []
+            for entry in frontier:
+                for neighbor in stencil.neighbors[entry]:
+                    if reached[neighbor] or tiles[neighbor] == -1:
+                        continue
+
+                    if not blocked[neighbor]:
+                        reached[neighbor] = True
+                        next_frontier.append(neighbor)
+                    elif is_attack:
+                        reached[neighbor] = True
+
+            frontier = next_frontier
+
+        return [tile for tile, is_reached in zip(tiles, reached) if is_reached]
 
     def get_possible_move_actions(self, is_zombie):
+        if self.move_generation == MOVEGEN_BITBOARD:
+            return self.get_bitboard_move_actions(is_zombie)
+
         move_actions = []
 
-        for character_state in self.character_states.values():
+        for character_state in self.character_list:
             if character_state.is_zombie != is_zombie:
                 continue
             
@@ -459,61 +1326,109 @@ class PyGameState:
                 continue
 
             position = character_state.get_position()
+            ignore_barricades = character_state.ability == AbilityType.MOVE_OVER_BARRICADES
             
-            tiles = self.get_tiles_in_range(position, character_state.move_speed, False, False)
+            tiles = self.get_tile_distances(position_to_index(position), character_state.move_speed, False, False, ignore_barricades)
 
             for tile in tiles:
-                move_action = MoveAction(character_state.id, tile)
+                move_action = MoveAction(character_state.id, index_to_position(tile))
                 move_actions.append(move_action)
 
         return move_actions
 
+    def get_bitboard_move_actions(self, is_zombie):
+        """
+        Same moves as the search, found by flood filling the free tiles of the board a whole distance ring at a time
+        """
+        move_actions = []
+        free_bits = {}
+
+        for character_state in self.character_list:
+            if character_state.is_zombie != is_zombie or character_state.is_stunned():
+                continue
+
+            ignore_barricades = character_state.ability == AbilityType.MOVE_OVER_BARRICADES
+            if ignore_barricades not in free_bits:
+                free_bits[ignore_barricades] = BOARD_BITS & ~self.board.get_blocking_bits(ignore_barricades)
+
+            start = character_state.tile
+            speed = character_state.move_speed
+            # The fill only works on the rows the character can reach, shifting by whole rows keeps the column masks valid
+            first_row = max(0, start // BOARD_SIZE - speed)
+            last_row = min(BOARD_SIZE - 1, start // BOARD_SIZE + speed)
+            offset = first_row * BOARD_SIZE
+            free = (free_bits[ignore_barricades] >> offset) & ((1 << ((last_row - first_row + 1) * BOARD_SIZE)) - 1)
+
+            # A character standing on blocking terrain cannot step off it, like in get_tile_distances
+            if not (free >> (start - offset)) & 1:
+                reached = 1 << (start - offset)
+            else:
+                reached = flood_fill_bits(1 << (start - offset), free, speed)
+
+            character_id = character_state.id
+            move_actions.extend(MoveAction(character_id, index_to_position(tile + offset)) for tile in bits_to_indices(reached))
+
+        return move_actions
+
     def get_possible_attack_actions(self, is_zombie):
         attack_actions = []
+        board = self.board
 
-        for character_state in self.character_states.values():
+        for character_state in self.character_list:
             if character_state.is_zombie != is_zombie:
                 continue
+
+            if not character_state.can_attack():
+                continue
             
-            attackable = self.get_tiles_in_range(character_state.position, character_state.attack_range, character_state.is_zombie, True, False)
+            attackable = self.get_stencil_tiles(ATTACK_STENCILS[character_state.class_type], character_state.tile, True)
+            if is_zombie:
+                enemies = [board.occupancy[index] - board.zombie_occupancy[index] for index in attackable]
+            else:
+                enemies = [board.zombie_occupancy[index] for index in attackable]
 
-            for position in attackable:
-                target = self.get_character_state_at_position(position)
-                if target and target.is_zombie != character_state.is_zombie:
-                    AttackAction(character_state.id, target.id, AttackActionType.CHARACTER)
+            for index, enemy_count in zip(attackable, enemies):
+                if enemy_count > 0:
+                    for target in self.get_character_states_at_index(index):
+                        if self.is_valid_attack(character_state, target):
+                            attack_actions.append(AttackAction(character_state.id, target.id, AttackActionType.CHARACTER))
                 
-                target = self.get_terrain_state(position)
-                if target:
-                    AttackAction(character_state.id, target.id, AttackActionType.TERRAIN)
-                    
+                if board.terrain_type[index] != NO_TERRAIN and not board.is_terrain_destroyed(index) and board.get_terrain_type(index) != TerrainType.RIVER:
+                    attack_actions.append(AttackAction(character_state.id, board.terrain_ids[index], AttackActionType.TERRAIN))
 
         return attack_actions
 
     def get_possible_ability_actions(self, is_zombie):
         ability_actions = []
+        board = self.board
 
-        for character_state in self.character_states.values():
+        for character_state in self.character_list:
             if character_state.is_zombie != is_zombie:
                 continue
 
+            if not character_state.can_ability():
+                continue
+
             if character_state.ability == AbilityType.HEAL:
-                targetable = self.get_tiles_in_range(character_state.position, character_state.attack_range, False, False, False)
-                for position in targetable:
-                    target = self.get_character_state_at_position(position)
-                    if (target != None) and (not target.is_zombie):
-                        ability_actions += AbilityAction(character_state.id, target.id, None, AbilityActionType.HEAL)
+                targetable = self.get_stencil_tiles(ABILITY_STENCILS[character_state.class_type], character_state.tile, False)
+                for index in targetable:
+                    if board.occupancy[index] == board.zombie_occupancy[index]:
+                        continue
+
+                    for target in self.get_character_states_at_index(index):
+                        if not target.is_zombie:
+                            ability_actions.append(AbilityAction(character_state.id, target.id, None, AbilityActionType.HEAL))
                         
             elif character_state.ability == AbilityType.BUILD_BARRICADE:
-                targetable = self.get_tiles_in_range(character_state.position, character_state.attack_range, False, False, False)
-                for position in targetable:
-                    target = self.get_terrain_state(position)
-                    if target == None:
-                        ability_actions += AbilityAction(character_state.id, None, position, AbilityActionType.BUILD_BARRICADE)
+                targetable = self.get_stencil_tiles(ABILITY_STENCILS[character_state.class_type], character_state.tile, False)
+                for index in targetable:
+                    if not board.has_terrain(index):
+                        ability_actions.append(AbilityAction(character_state.id, None, index_to_position(index), AbilityActionType.BUILD_BARRICADE))
 
         return ability_actions
     
     def get_possible_actions(self):
-        is_zombie = self.get_is_zombie_turn
+        is_zombie = self.get_is_zombie_turn()
         
         if(self.phase == GamePhase.MOVE):
             return self.get_possible_move_actions(is_zombie)
@@ -525,10 +1440,48 @@ class PyGameState:
         assert("Something went wrong...")
     
     def to_game_state(self):
-        characters = {cs.id : Character(cs.id, cs.position, cs.is_zombie, cs.class_type, cs.health, cs.is_stunned()) for cs in self.character_states.values()}
+        characters = {cs.id : Character(cs.id, cs.position, cs.is_zombie, cs.class_type, cs.health, cs.is_stunned()) for cs in self.character_list}
         terrain = {ts.id : Terrain(ts.id, ts.position, ts.health, ts.can_attack_through, ts.terrain_type) for ts in self.terrain_states.values()}
         return GameState(self.turn, characters, terrain)
     
+    def matches_game_state(self, game_state: GameState):
+        """
+        Whether the engine's game state shows the same characters and standing terrain, without asserting
+
+        Cooldowns are not sent by the engine so they are not compared
+        """
+        if game_state.turn != self.turn or len(game_state.characters) != len(self.characters):
+            return False
+
+        for id, character in game_state.characters.items():
+            slot = self.slots_by_id.get(id)
+            if slot is None:
+                return False
+
+            character_state = self.character_list[slot]
+            if (character_state.tile != position_to_index(character.position)
+                    or character_state.health != character.health
+                    or bool(character_state.is_zombie) != character.is_zombie
+                    or character_state.class_type != character.class_type
+                    or character_state.is_stunned() != character.is_stunned):
+                return False
+
+        # Terrain is matched by position, barricades we simulated carry our own ids rather than the engine's
+        board = self.board
+        reported = set()
+        for terrain in game_state.terrains.values():
+            index = position_to_index(terrain.position)
+            if not board.has_terrain(index) or board.terrain_health[index] != terrain.health:
+                return False
+            reported.add(index)
+
+        # Standing terrain the engine does not have, such as a barricade we simulated that was never built
+        for index in board.terrain_indices.values():
+            if index not in reported and board.terrain_health[index] != 0:
+                return False
+
+        return True
+
     def is_equal(self, other_game_state: GameState):
         my_game_state = self.to_game_state()
         
@@ -0,0 +1,281 @@
+import math
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+from game.game_state import GameState
+from strategy.pyengine import PyGameState, GamePhase
+from strategy.action_generation import take_joint_actions
+from strategy.state_evaluation import evaluate_states, DEFAULT_WEIGHTS
+
+
+class SharedTree:
+    """
+    Flat search tree laid out in one shared memory block, one typed array per node field indexed by node
+
+    Children of a node are allocated as one contiguous block, child k of a node is reached by the k-th joint action
+    of the ordered generator, so any process can rebuild a node's state by replaying actions from the root
+    """
+
+    FIELDS = (("visits", "q"), ("reward", "d"), ("virtual_loss", "q"), ("parent", "q"), ("first_child", "q"), ("child_count", "q"))
+
+    def __init__(self, buffer, capacity):
+        self.capacity = capacity
+        # The header only holds the number of allocated nodes
+        self.header = buffer[:8].cast("q")
+        offset = 8
+        for name, code in self.FIELDS:
+            setattr(self, name, buffer[offset:offset + 8 * capacity].cast(code))
+            offset += 8 * capacity
+
+    @classmethod
+    def size(cls, capacity):
+        return 8 + 8 * capacity * len(cls.FIELDS)
+
+    def reset(self):
+        self.header[0] = 0
+        self.allocate(1, -1)
+
+    def allocate(self, count, parent):
+        """
+        First node of a fresh block of count nodes, or -1 when the tree is full, callers hold the lock
+        """
+        first = self.header[0]
+        if first + count > self.capacity:
+            return -1
+
+        for node in range(first, first + count):
+            self.visits[node] = 0
+            self.reward[node] = 0.0
+            self.virtual_loss[node] = 0
+            self.parent[node] = parent
+            self.first_child[node] = -1
+            # -1 marks a node whose children have not been generated yet
+            self.child_count[node] = -1
+        self.header[0] = first + count
+        return first
+
+    def __len__(self):
+        return self.header[0]
+
+    def release(self):
+        for name, _ in self.FIELDS:
+            getattr(self, name).release()
+        self.header.release()
+
+
+class SharedTreeWorker:
+    """
+    One process's share of a tree-parallel search, descends the shared tree replaying actions on its own copy of the root
+    """
+
+    def __init__(self, tree: SharedTree, lock, exploration_constant, eps, max_children, virtual_loss, evaluation_weights):
+        self.tree = tree
+        self.lock = lock
+        self.exploration_constant = exploration_constant
+        self.eps = eps
+        self.max_children = max_children
+        self.virtual_loss = virtual_loss
+        self.evaluation_weights = evaluation_weights
+        # Joint actions of the nodes this process has passed through, the same in every process
+        self.node_actions: dict[int, list] = {}
+
+    def search(self, state: PyGameState, deadline):
+        self.node_actions = {}
+        num_rounds = 0
+        while time.time() < deadline:
+            self.execute_round(state)
+            num_rounds += 1
+        return num_rounds
+
+    def expand(self, node, state: PyGameState):
+        tree = self.tree
+        actions = self.node_actions.get(node)
+        if actions is None:
+            actions = self.node_actions[node] = take_joint_actions(state, self.max_children)
+
+        if tree.child_count[node] == -1:
+            with self.lock:
+                if tree.child_count[node] == -1:
+                    first = tree.allocate(len(actions), node)
+                    if first == -1:
+                        return False
+                    tree.first_child[node] = first
+                    tree.child_count[node] = len(actions)
+
+        return True
+
+    def select_child(self, node):
+        tree = self.tree
+        first = tree.first_child[node]
+        log_visits = math.log(max(tree.visits[node] + tree.virtual_loss[node], 1))
+        best_value = float("-inf")
+        best_child = -1
+
+        for child in range(first, first + tree.child_count[node]):
+            visits = tree.visits[child] + tree.virtual_loss[child]
+            if visits == 0:
+                return child
+
+            # Pending descents by other workers count as visits that lost, pushing this worker onto other lines
+            value = ((tree.reward[child] - self.virtual_loss * tree.virtual_loss[child]) / visits
+                     + self.exploration_constant * math.sqrt(2 * log_visits / visits))
+            if value > best_value:
+                best_value = value
+                best_child = child
+
+        return best_child
+
+    def execute_round(self, state: PyGameState):
+        tree = self.tree
+        node = 0
+        path = [0]
+        sides = [state.get_is_zombie_turn()]
+        records = []
+
+        while not state.is_finished():
+            if not self.expand(node, state) or tree.child_count[node] == 0:
+                break
+
+            child = self.select_child(node)
+            is_new = tree.visits[child] == 0
+            with self.lock:
+                tree.virtual_loss[child] += 1
+
+            records.append(state.apply(self.node_actions[node][child - tree.first_child[node]]))
+            node = child
+            path.append(child)
+            sides.append(state.get_is_zombie_turn())
+            if is_new:
+                break
+
+        reward = evaluate_states([state], self.evaluation_weights)[0]
+        for record in reversed(records):
+            state.undo(record)
+
+        # Same convention as TreeSearch.back_propogate, a node's reward is seen from the side choosing at its parent
+        leaf_is_zombie_turn = sides[-1]
+        with self.lock:
+            for depth in range(len(path) - 1, -1, -1):
+                node = path[depth]
+                tree.visits[node] += 1
+                if depth > 0:
+                    tree.virtual_loss[node] -= 1
+                    tree.reward[node] += reward if sides[depth - 1] == leaf_is_zombie_turn else -reward
+                reward *= self.eps
+
+
+def run_shared_tree_worker(connection, lock, memory_name, capacity, settings):
+    memory = shared_memory.SharedMemory(name=memory_name)
+    tree = SharedTree(memory.buf, capacity)
+    worker = SharedTreeWorker(tree, lock, *settings)
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+
+        state_bytes, time_limit = message
+        num_rounds = worker.search(PyGameState.deserialize(state_bytes), time.time() + time_limit / 1000)
+        connection.send(num_rounds)
+
+    tree.release()
+    memory.close()
+    connection.close()
+
+
+class SharedTreeSearch:
+    """
+    Tree-parallel search, every worker process deepens the same tree in shared memory and virtual loss spreads their descents
+
+    Workers and the shared block are created on the first search and kept until close
+    """
+
+    def __init__(self, workers, player_is_zombie, exploration_constant = .1, eps = .9, time_limit = 2000, capacity = 200000,
+                 max_children = 6, virtual_loss = 10.0, evaluation_weights = DEFAULT_WEIGHTS):
+        self.workers = workers or os.cpu_count()
+        self.player_is_zombie = player_is_zombie
+        self.time_limit = time_limit
+        self.capacity = capacity
+        self.max_children = max_children
+        self.settings = (exploration_constant, eps, max_children, virtual_loss, evaluation_weights)
+        self.memory = None
+        self.tree: SharedTree | None = None
+        self.processes = []
+        self.connections = []
+        self.num_rounds = 0
+
+    def start(self):
+        self.memory = shared_memory.SharedMemory(create=True, size=SharedTree.size(self.capacity))
+        self.tree = SharedTree(self.memory.buf, self.capacity)
+        lock = multiprocessing.Lock()
+
+        for _ in range(self.workers):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=run_shared_tree_worker, daemon=True,
+                                              args=(child_connection, lock, self.memory.name, self.capacity, self.settings))
+            process.start()
+            child_connection.close()
+            self.processes.append(process)
+            self.connections.append(parent_connection)
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.connections = []
+
+        if self.memory is not None:
+            self.tree.release()
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+            self.tree = None
+
+    def start_pondering(self):
+        # The workers keep no tree between turns, so there is nothing to ponder on
+        pass
+
+    def stop_pondering(self):
+        pass
+
+    def decide(self, game_state: GameState, cooldowns):
+        """
+        Same interface as SearchSession.decide
+        """
+        return self.search(PyGameState(game_state, cooldowns, GamePhase.MOVE))
+
+    def search(self, state: PyGameState):
+        if not self.processes:
+            self.start()
+
+        self.tree.reset()
+        state_bytes = state.serialize()
+        for connection in self.connections:
+            connection.send((state_bytes, self.time_limit))
+        self.num_rounds = sum(connection.recv() for connection in self.connections)
+        print(f"Workers: {self.workers} \t num rounds: {self.num_rounds} \t nodes: {len(self.tree)}")
+
+        # The root's children were generated from the same ordered actions, so they can be replayed here
+        tree = self.tree
+        phases = 2 if self.player_is_zombie else 3
+        actions = []
+        node = 0
+        state = state.clone()
+        for _ in range(phases):
+            first, count = tree.first_child[node], tree.child_count[node]
+            visited = [child for child in range(first, first + max(count, 0)) if tree.visits[child] > 0]
+            if not visited:
+                break
+
+            # Most visited like the serial search, ties go to the better mean reward
+            node = max(visited, key=lambda child: (tree.visits[child], tree.reward[child] / tree.visits[child]))
+            best_actions = take_joint_actions(state, self.max_children)[node - first]
+            actions.append(best_actions)
+            state.advance(best_actions)
+
+        return actions + [[] for _ in range(phases - len(actions))]
@@ -13,6 +13,7 @@ from game.character.action.move_action import MoveAction
 from game.character.character_class_type import CharacterClassType
 from game.game_state import GameState
 from game.util.position import Position
+from strategy.distance_field import get_game_state_zombie_reach_field
 from strategy.strategy import Strategy
 
 
@@ -42,31 +43,19 @@ class SimpleHumanStrategy(Strategy):
         
         choices = []
 
+        # One search from every zombie at once tells us how far the nearest zombie has to walk to each tile
+        zombie_reach = get_game_state_zombie_reach_field(game_state)
+
         for [character_id, moves] in possible_moves.items():
             if len(moves) == 0:  # No choices... Next!
                 continue
 
-            pos = game_state.characters[character_id].position  # position of the human
-            closest_zombie_pos = pos  # default position is zombie's pos
-            closest_zombie_distance =  1234  # large number, map isn't big enough to reach this distance
-            
-
-            # Iterate through every zombie to find the closest one
-            for c in game_state.characters.values():
-                if not c.is_zombie:
-                    continue  # Fellow humans are frens :D, ignore them
-
-                distance = abs(c.position.x - pos.x) + abs(c.position.y - pos.y)  # calculate manhattan distance between human and zombie
-                if distance < closest_zombie_distance:  # If distance is closer than current closest, replace it!
-                    closest_zombie_pos = c.position
-                    closest_zombie_distance = distance
-
-            # Move as far away from the zombie as possible
-            move_distance = -1  # Distance between the move action's destination and the closest zombie
+            # Move to the tile the zombies need the longest walk to reach
+            move_distance = -1  # Walking distance between the move action's destination and the closest zombie
             move_choice = moves[0]  # The move action the human will be taking
 
             for m in moves:
-                distance = abs(m.destination.x - closest_zombie_pos.x) + abs(m.destination.y - closest_zombie_pos.y)  # calculate manhattan distance
+                distance = zombie_reach.at_position(m.destination)  # walking distance around terrain, not manhattan
 
                 if distance > move_distance:  # If distance is further, that's our new choice!
                     move_distance = distance
@@ -8,6 +8,7 @@ from game.character.action.attack_action import AttackAction
 from game.character.action.move_action import MoveAction
 from game.game_state import GameState
 from game.character.action.attack_action_type import AttackActionType
+from strategy.distance_field import get_game_state_nearest_human_field
 from strategy.strategy import Strategy
 
 
@@ -21,29 +22,18 @@ class SimpleZombieStrategy(Strategy):
         
         choices = []
 
+        # One search from every human at once tells us how far the nearest human is from each tile
+        nearest_human = get_game_state_nearest_human_field(game_state)
+
         for [character_id, moves] in possible_moves.items():
             if len(moves) == 0:  # No choices... Next!
                 continue
 
-            pos = game_state.characters[character_id].position  # position of the zombie
-            closest_human_pos = pos  # default position is zombie's pos
-            closest_human_distance = 1984  # large number, map isn't big enough to reach this distance
-
-            # Iterate through every human to find the closest one
-            for c in game_state.characters.values():
-                if c.is_zombie:
-                    continue  # Fellow zombies are frens :D, ignore them
-
-                distance = abs(c.position.x - pos.x) + abs(c.position.y - pos.y) # calculate manhattan distance between human and zombie
-                if distance < closest_human_distance:  # If distance is closer than current closest, replace it!
-                    closest_human_pos = c.position
-                    closest_human_distance = distance
-
-            # Move as close to the human as possible
-            move_distance = 1337  # Distance between the move action's destination and the closest human
+            # Move as close to a human as possible
+            move_distance = 1337  # Walking distance between the move action's destination and the closest human
             move_choice = moves[0]  # The move action the zombie will be taking
             for m in moves:
-                distance = abs(m.destination.x - closest_human_pos.x) + abs(m.destination.y - closest_human_pos.y)  # calculate manhattan distance
+                distance = nearest_human.at_position(m.destination)  # walking distance around terrain, not manhattan
 
                 # If distance is closer, that's our new choice!
                 if distance < move_distance:  
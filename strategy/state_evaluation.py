@@ -1,6 +1,20 @@
+from array import array
+
 from strategy.pyengine import PyGameState
+from strategy.action_generation import take_joint_actions
+from strategy.distance_field import get_zombie_reach_field, ZOMBIE_MOVE_SPEED
 import random
 
+# Features are oriented so that larger values are better for the humans
+FEATURES = ("score", "nearest_enemy_distance", "human_health", "zombie_stuns", "zombie_reach_turns")
+
+# Only the score difference, matching evaluate_state
+DEFAULT_WEIGHTS = {"score": 1.0, "nearest_enemy_distance": 0.0, "human_health": 0.0, "zombie_stuns": 0.0, "zombie_reach_turns": 0.0}
+RICH_WEIGHTS = {"score": 1.0, "nearest_enemy_distance": 0.5, "human_health": 1.0, "zombie_stuns": 2.0, "zombie_reach_turns": 1.0}
+
+# Zombie turns the reach field looks ahead, humans further away than this count as this many turns plus one
+REACH_HORIZON = 3
+
 
 def evaluate_state(state:PyGameState):
     human_score, zombie_score = state.get_scores()
@@ -9,5 +23,70 @@ def evaluate_state(state:PyGameState):
     else:
         return human_score - zombie_score
     
-def get_action_set(state: PyGameState):
-    return [state.get_possible_actions()[:3], state.get_possible_actions()[3:6]]
\ No newline at end of file
+def get_action_set(state: PyGameState, count = 2):
+    return take_joint_actions(state, count)
+
+def pack_states(states: list[PyGameState], features = FEATURES) -> dict[str, array]:
+    """
+    Struct-of-arrays view of the states, one array per feature plus the sign of the side to move
+    Features missing from features are left at zero
+    """
+    packed = dict((feature, array("d", bytes(8 * len(states)))) for feature in FEATURES)
+    packed["sign"] = array("d", bytes(8 * len(states)))
+    # The score alone is kept incrementally, every other feature needs a pass over the characters
+    scans_characters = any(feature != "score" for feature in features)
+
+    for i, state in enumerate(states):
+        packed["sign"][i] = -1.0 if state.get_is_zombie_turn() else 1.0
+        if "score" in features:
+            human_score, zombie_score = state.get_scores()
+            packed["score"][i] = human_score - zombie_score
+
+        if not scans_characters:
+            continue
+
+        humans = [character_state for character_state in state.character_list if not character_state.is_zombie]
+        zombies = [character_state for character_state in state.character_list if character_state.is_zombie]
+
+        if "human_health" in features:
+            packed["human_health"][i] = sum(human.health for human in humans)
+        if "zombie_stuns" in features:
+            packed["zombie_stuns"][i] = sum(1 for zombie in zombies if zombie.is_stunned())
+
+        if humans and zombies and "zombie_reach_turns" in features:
+            # Mean over humans of the zombie turns needed to walk to them, searched only up to the horizon
+            zombie_reach = get_zombie_reach_field(state, REACH_HORIZON * ZOMBIE_MOVE_SPEED)
+            packed["zombie_reach_turns"][i] = sum(
+                min(zombie_reach.turns_at(human.tile), REACH_HORIZON + 1) for human in humans
+            ) / len(humans)
+
+        if humans and zombies and "nearest_enemy_distance" in features:
+            # Mean over humans of the manhattan distance to the closest zombie
+            zombie_positions = [(zombie.position.x, zombie.position.y) for zombie in zombies]
+            packed["nearest_enemy_distance"][i] = sum(
+                min(abs(human.position.x - x) + abs(human.position.y - y) for x, y in zombie_positions) for human in humans
+            ) / len(humans)
+
+    return packed
+
+def evaluate_packed(packed: dict[str, array], weights: dict[str, float] = DEFAULT_WEIGHTS) -> array:
+    columns = [packed[feature] for feature in FEATURES if weights.get(feature)]
+    feature_weights = [weights[feature] for feature in FEATURES if weights.get(feature)]
+
+    rewards = array("d", bytes(8 * len(packed["sign"])))
+    for column, weight in zip(columns, feature_weights):
+        rewards = array("d", [reward + weight * value for reward, value in zip(rewards, column)])
+
+    return array("d", [reward * sign for reward, sign in zip(rewards, packed["sign"])])
+
+def evaluate_states(states: list[PyGameState], weights: dict[str, float] = DEFAULT_WEIGHTS) -> array:
+    """
+    Rewards for many leaves at once, each from the point of view of the side to move like evaluate_state
+    """
+    features = tuple(feature for feature in FEATURES if weights.get(feature))
+    if features == ("score",):
+        # The score is kept incrementally, so the default weights never need packing
+        weight = weights["score"]
+        return array("d", [weight * evaluate_state(state) for state in states])
+
+    return evaluate_packed(pack_states(states, features), weights)
@@ -0,0 +1,44 @@
+import json
+import os
+
+# Sections of a search round that are timed, each one's time excludes the sections nested inside it
+TIMED_SECTIONS = ("selection", "expansion", "cloning", "evaluation")
+
+
+def get_telemetry_path(gamelog_path: str | None, side: str):
+    """
+    JSONL file next to the gamelog main.run passes in OUTPUT, one per side since both bots share the gamelog name
+    None when there is no gamelog to sit next to
+    """
+    if not gamelog_path:
+        return None
+
+    base, _ = os.path.splitext(gamelog_path)
+    return f"{base}.{side}.telemetry.jsonl"
+
+
+def write_record(path: str, record: dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as file:
+        file.write(json.dumps(record) + "\n")
+
+
+def get_branching_factor(node_count, depth):
+    """
+    Effective branching factor b of a uniform tree of the given depth with as many nodes, 1 + b + ... + b^depth = node_count
+    """
+    if depth == 0 or node_count <= depth + 1:
+        return 1.0
+
+    # b^depth alone stays below node_count, so b is below its depth-th root
+    low, high = 1.0, node_count ** (1 / depth)
+    for _ in range(50):
+        middle = (low + high) / 2
+        if sum(middle ** level for level in range(depth + 1)) < node_count:
+            low = middle
+        else:
+            high = middle
+
+    return (low + high) / 2
@@ -0,0 +1,85 @@
+import time
+
+TURNS = 200
+# The engine gives each phase about 2.5 s, everything we do after reading its message counts
+ENGINE_PHASE_LIMIT = 2.5
+# Left for serialising and sending the reply
+REPLY_MARGIN = 0.2
+# Average search time per turn we plan for, the bank below is this much per turn we play
+AVERAGE_TURN_TIME = 1.8
+# Shortest search worth running, even when the bank is nearly empty
+MIN_TURN_TIME = 0.3
+# A close decision may use this much more than its share, up to the hard limit
+EXTENSION_FACTOR = 1.5
+# The top two root children are close when the runner-up has at least this share of the leader's visits
+CLOSE_RATIO = 0.8
+
+
+class TimeManager:
+    """
+    Search budget for each turn, measured from when the engine's message was received rather than from when the search starts
+
+    Time saved on decisive turns goes back into a bank shared by the rest of the game, only the move phase searches
+    since the attack and ability answers come from the same tree
+    """
+
+    def __init__(self, average_turn_time = AVERAGE_TURN_TIME, hard_limit = ENGINE_PHASE_LIMIT - REPLY_MARGIN):
+        self.hard_limit = hard_limit
+        self.bank = average_turn_time * TURNS / 2
+        self.received_at = time.time()
+        self.soft_deadline = self.received_at
+        self.extended_deadline = self.received_at
+        self.hard_deadline = self.received_at
+        self.started_at = self.received_at
+        self.extended = False
+        self.clock_started = False
+        # Search speed measured on the last search, None until one has been timed
+        self.rounds_per_second = None
+
+    def start_clock(self, received_at = None):
+        self.received_at = received_at if received_at is not None else time.time()
+        self.clock_started = True
+
+    def start_search(self, turn):
+        """
+        Sets this turn's deadlines, one turn in two is ours
+        """
+        own_turns_left = max(1, (TURNS - turn + 1) // 2)
+        share = max(MIN_TURN_TIME, self.bank / own_turns_left)
+
+        self.started_at = time.time()
+        # A clock nobody started this turn would hold the last message's time, the search start is the best guess left
+        if not self.clock_started:
+            self.received_at = self.started_at
+        self.clock_started = False
+        self.hard_deadline = self.received_at + self.hard_limit
+        self.soft_deadline = min(self.received_at + share, self.hard_deadline)
+        self.extended_deadline = min(self.received_at + share * EXTENSION_FACTOR, self.hard_deadline)
+        self.extended = False
+
+    def should_stop(self, now, best_visits, second_visits, rounds_per_second):
+        """
+        Whether the search should end now given the visits of the two most visited root children,
+        the search plays the most visited one. rounds_per_second is None while the speed is still unknown,
+        the search then only stops at its deadline
+        """
+        if now >= self.hard_deadline:
+            return True
+
+        # A close decision gets until the extended deadline, and is extended once it runs past the soft one
+        is_close = best_visits > 0 and second_visits >= CLOSE_RATIO * best_visits
+        deadline = self.extended_deadline if is_close else self.soft_deadline
+        if is_close and now >= self.soft_deadline:
+            self.extended = True
+
+        # The runner-up cannot catch up in the rounds left before the deadline
+        if rounds_per_second is not None and best_visits - second_visits > rounds_per_second * max(0.0, deadline - now):
+            return True
+
+        return now >= deadline
+
+    def end_search(self, rounds_per_second = None, now = None):
+        now = now if now is not None else time.time()
+        if rounds_per_second is not None:
+            self.rounds_per_second = rounds_per_second
+        self.bank = max(0.0, self.bank - (now - self.received_at))
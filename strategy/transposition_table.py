@@ -0,0 +1,67 @@
+from collections import OrderedDict
+
+REPLACE_LRU = "lru"
+REPLACE_DEPTH = "depth"
+
+
+class TranspositionTable:
+    """
+    Bounded map from PyGameState hashes to search nodes, so transpositions share one node
+
+    "lru" evicts the least recently used entry once full. "depth" is direct-mapped on the hash and keeps
+    whichever of two colliding nodes has been searched more, the MCTS analogue of depth-preferred replacement,
+    get_visits tells it how much a node has been searched
+    """
+
+    def __init__(self, capacity: int, replacement_policy: str = REPLACE_LRU, get_visits = lambda node: node.num_visits):
+        assert replacement_policy in (REPLACE_LRU, REPLACE_DEPTH), f"Unknown replacement policy {replacement_policy}"
+        self.capacity = capacity
+        self.replacement_policy = replacement_policy
+        self.get_visits = get_visits
+        self.entries = OrderedDict() if replacement_policy == REPLACE_LRU else [None] * capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        if self.replacement_policy == REPLACE_LRU:
+            node = self.entries.get(key)
+            if node is not None:
+                self.entries.move_to_end(key)
+        else:
+            entry = self.entries[key % self.capacity]
+            node = entry[1] if entry is not None and entry[0] == key else None
+
+        if node is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return node
+
+    def put(self, key, node):
+        if self.replacement_policy == REPLACE_LRU:
+            self.entries[key] = node
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            return
+
+        slot = key % self.capacity
+        entry = self.entries[slot]
+        if entry is not None and entry[0] != key:
+            if self.get_visits(entry[1]) > self.get_visits(node):
+                return
+            self.evictions += 1
+
+        self.entries[slot] = (key, node)
+
+    def __len__(self):
+        if self.replacement_policy == REPLACE_LRU:
+            return len(self.entries)
+        return sum(1 for entry in self.entries if entry is not None)
+
+    def get_hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -1,113 +1,581 @@
 from typing import *
 import time
 import math
+import random
+import threading
 
 from game.game_state import GameState
 from game.character.character import Character
-from strategy.pyengine import PyGameState, GamePhase
-from strategy.state_evaluation import evaluate_state, get_action_set
-
-class Node:
-    def __init__(self, state: PyGameState, parent, actions: list = []):
-        self.state: PyGameState = state
-        self.parent:Node = parent
-        self.is_terminal = (state.turn == 200) or (state.get_humans_count() == 0)
-        self.is_fully_expanded = self.is_terminal
-        self.is_zombie_turn = state.get_is_zombie_turn()
-        self.actions = actions
-        self.to_explore = []
-        self.num_visits = 0
-        self.total_reward = 0
-        self.children: list[Node] = []
-        
+from strategy.pyengine import PyGameState, GamePhase, PLAYOUT_GREEDY, MOVEGEN_SEARCH
+from strategy.state_evaluation import evaluate_states, DEFAULT_WEIGHTS
+from strategy.action_generation import generate_joint_actions, get_action_options, ORDERED, UNIFORM
+from strategy.transposition_table import TranspositionTable, REPLACE_LRU
+from strategy.node_pool import NodePool
+from strategy.character_bandits import CharacterBandits
+from strategy.time_manager import TimeManager
+from strategy.telemetry import TIMED_SECTIONS, get_branching_factor, write_record
+
+# Progressive widening (C, alpha) for each side keyed by is_zombie, a node may have ceil(C * visits^alpha) children
+DEFAULT_WIDENING = {False: (1.0, 0.5), True: (1.0, 0.5)}
+# Widening nodes start with room for this many edges and grow as they need
+WIDENING_EDGE_BLOCK = 2
+# Children of a node without widening, unless max_children says otherwise
+FIXED_MAX_CHILDREN = 6
+
+# Seconds the reply waits for the pondering thread to finish its round before giving up on its tree
+PONDER_JOIN_TIMEOUT = 0.01
+# Pondering stops by itself after this many seconds without a message
+PONDER_TIME_LIMIT = 30
+# Rounds between two checks of a time manager's stopping rule
+TIME_CHECK_INTERVAL = 16
+# Share of the node budget left holding states after an eviction, the rest is room to grow before the next one
+EVICTION_TARGET = 0.9
+# Node budget of a session's tree, a state takes about 50 KB so this is around 1 GB, reuse and pondering would otherwise grow it all game
+DEFAULT_NODE_BUDGET = 20000
+
 class TreeSearch:
-    def __init__(self, root_state: GameState, cooldowns, phase: GamePhase, exploration_constant, eps, player_is_zombie, time_limit = 2000):
-        self.root: Node = Node(PyGameState(root_state, cooldowns, phase), None)
+    """
+    Monte Carlo tree search over a NodePool, nodes are pool indices and statistics live on the edges into them
+
+    In decoupled mode joint actions are not taken from a generator, every character picks its own action from its own
+    bandit and the joint action they make up is played, becoming a new child while the node is under its child limit.
+    Once it is full the characters pick among the actions its children play and the child agreeing with most picks is
+    played. Every reward trains the bandits of the characters in the joint action played,
+    so the choices to learn are the sum of the characters' options instead of their product
+    """
+
+    def __init__(self, root_state: GameState | PyGameState, cooldowns, phase: GamePhase, exploration_constant, eps, player_is_zombie, time_limit = 2000,
+                 transposition_capacity = 100000, replacement_policy = REPLACE_LRU, leaf_batch_size = 1, evaluation_weights = DEFAULT_WEIGHTS,
+                 max_children = None, sampling = ORDERED, top_k = 2, playout_depth = 0, playout_policy = PLAYOUT_GREEDY, seed = None,
+                 move_generation = MOVEGEN_SEARCH, verbose = True, pool_capacity = 1024, widening = None, node_budget = None,
+                 decoupled = False, decision_sampling = None):
+        # A PyGameState root already carries its cooldowns and phase
+        if not isinstance(root_state, PyGameState):
+            root_state = PyGameState(root_state, cooldowns, phase)
+        # Clones inherit the move generation mode, so setting it on the root covers the whole tree
+        root_state.move_generation = move_generation
+        # Without widening a node has a fixed number of children, with it only max_children caps them if given
+        if max_children is None:
+            max_children = FIXED_MAX_CHILDREN if widening is None else math.inf
+        self.pool = NodePool(pool_capacity, max_children if widening is None else min(max_children, WIDENING_EDGE_BLOCK))
+        self.root = self.pool.add_node(root_state)
         self.exploration_constant = exploration_constant
         self.eps = eps
         self.player_is_zombie = player_is_zombie
         self.time_limit = time_limit
+        self.transpositions = TranspositionTable(transposition_capacity, replacement_policy, lambda node: self.pool.visits[node])
+        self.transpositions.put(root_state.get_hash(), self.root)
+        self.leaf_batch_size = leaf_batch_size
+        self.evaluation_weights = evaluation_weights
+        self.max_children = max_children
+        # None keeps a fixed max_children per node, otherwise max_children is only a hard cap
+        self.widening = widening
+        self.decoupled = decoupled
+        # Most nodes holding a state at once, None lets the tree grow without limit
+        self.node_budget = node_budget
+        self.evictions = 0
+        self.sampling = sampling
+        # Sampling for the nodes of the root's own turn, the ones the decision is read from, None keeps sampling
+        self.decision_sampling = decision_sampling
+        self.top_k = top_k
+        # Phases played past each new leaf before it is scored, 0 scores the leaf itself
+        self.playout_depth = playout_depth
+        self.playout_policy = playout_policy
+        self.rng = random.Random(seed)
+        self.verbose = verbose
+        self.num_rounds = 0
+        self.search_seconds = 0.0
+        # Seconds spent in each section over the last search, each including the sections nested in it
+        self.timings = dict.fromkeys(TIMED_SECTIONS, 0.0)
+        # Node reached by the actions the last search picked, where pondering continues from
+        self.principal_node = None
     
-    def search(self):
-        time_limit = time.time() + self.time_limit / 1000
+    def promote(self, node):
+        """
+        Makes node the root, the pool and transposition table are rebuilt from its subtree so the rest can be freed
+        """
+        self.pool, mapping = self.pool.extract(node)
+        self.root = mapping[node]
+        self.rebuild_transpositions()
+
+    def rebuild_transpositions(self):
+        transpositions = TranspositionTable(self.transpositions.capacity, self.transpositions.replacement_policy, lambda node: self.pool.visits[node])
+        for node in range(len(self.pool)):
+            if len(transpositions) >= transpositions.capacity:
+                break
+            if self.pool.states[node] is not None:
+                transpositions.put(self.pool.states[node].get_hash(), node)
+
+        self.transpositions = transpositions
+
+    def evict(self):
+        """
+        Drops the states of the least visited nodes until the tree is back under its node budget
+
+        Nodes are kept from the most visited down, outside of transpositions a child is never visited more than its parent
+        so what is kept stays connected to the root. The first node dropped on each line keeps its statistics and is rebuilt if selection
+        returns to it, everything below it is freed
+        """
+        pool = self.pool
+        order = [self.root]
+        seen = {self.root}
+        for node in order:
+            for edge in pool.get_edges(node):
+                child = pool.edge_child[edge]
+                if child not in seen:
+                    seen.add(child)
+                    order.append(child)
+
+        # The sort is stable, so among equally visited nodes the shallower ones are kept
+        live = [node for node in order if pool.states[node] is not None]
+        live.sort(key=lambda node: -pool.visits[node])
+        keep = set(live[:int(self.node_budget * EVICTION_TARGET)])
+        keep.add(self.root)
+
+        self.pool, mapping = pool.extract(self.root, keep)
+        self.root = mapping[self.root]
+        self.rebuild_transpositions()
+        self.evictions += 1
+
+    def find_node(self, game_state: GameState, cooldowns):
+        """
+        The node below the root whose state is the one the engine reports at the start of our next turn
+
+        Zobrist hashes are tried first, they miss whenever our cooldown bookkeeping differs from the tree's,
+        so the nodes of the right turn are then diffed against the game state itself
+        """
+        pool = self.pool
+        observed_hash = PyGameState(game_state, cooldowns, GamePhase.MOVE).get_hash()
+        candidates = []
+        visited = set()
+        frontier = [self.root]
+
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                if node in visited:
+                    continue
+                visited.add(node)
+
+                state = pool.states[node]
+                if state is None:
+                    continue
+                if state.turn == game_state.turn and state.phase == GamePhase.MOVE and node != self.root:
+                    if state.get_hash() == observed_hash:
+                        return node
+                    candidates.append(node)
+                elif state.turn <= game_state.turn:
+                    next_frontier.extend(pool.edge_child[edge] for edge in pool.get_edges(node))
+            frontier = next_frontier
+
+        for node in candidates:
+            if pool.states[node].matches_game_state(game_state):
+                return node
+
+        return None
+
+    def search(self, time_manager: TimeManager | None = None):
+        """
+        Searches for time_limit milliseconds, or until time_manager says the decision is settled
+        """
+        self.timings = dict.fromkeys(TIMED_SECTIONS, 0.0)
+        start = time.perf_counter()
+        if time_manager is None:
+            num_rounds = self.run_for(self.time_limit / 1000)
+        else:
+            num_rounds = self.run_managed(time_manager)
+        self.num_rounds = num_rounds
+        self.search_seconds = time.perf_counter() - start
+            
+        pool = self.pool
+        best_edge = self.get_most_visited_edge(self.root)
+        
+        if best_edge != -1 and self.verbose:
+            print(f"Value: {pool.edge_reward[best_edge]} \t num rounds: {num_rounds} \t transpositions: {self.transpositions.hits} hits / {self.transpositions.misses} misses")
         
+        phases = 2 if self.player_is_zombie else 3
+        actions = []
+        node = self.root
+        for _ in range(phases):
+            best_edge = self.get_most_visited_edge(node) if node is not None else -1
+            actions.append(pool.edge_actions[best_edge] if best_edge != -1 else [])
+            node = pool.edge_child[best_edge] if best_edge != -1 else None
+        self.principal_node = node
+            
+        return actions
+
+    def run_for(self, seconds):
+        time_limit = time.time() + seconds
+
         num_rounds = 0
         while time.time() < time_limit:
             self.execute_round()
             num_rounds += 1
-            
-        best_child = self.get_best_child(self.root, 0)
-        
-        if best_child:
-            print(f"Value: {best_child.total_reward} \t num rounds: {num_rounds}")
-        
-        if self.player_is_zombie:
-            if best_child == None:
-                return [[], []]
-            return [best_child.actions, self.get_best_child(best_child, 0).actions]
-        
-        else: 
-            if best_child == None:
-                return [[], [], []]
-            return [best_child.actions, self.get_best_child(best_child, 0).actions, self.get_best_child(self.get_best_child(best_child, 0), 0).actions]
+        return num_rounds
+
+    def run_managed(self, time_manager: TimeManager):
+        time_manager.start_search(self.pool.states[self.root].turn)
+
+        num_rounds = 0
+        while True:
+            now = time.time()
+            if num_rounds % TIME_CHECK_INTERVAL == 0 or now >= time_manager.hard_deadline:
+                # Read afresh, an eviction replaces the pool and renumbers the root
+                pool = self.pool
+                root = self.root
+                first = pool.first_edge[root]
+                visits = sorted(pool.edge_visits[first:first + pool.edge_count[root]], reverse=True) + [0, 0]
+                # A reused root already has a leader, so the speed must be known before it can be called uncatchable
+                if num_rounds >= TIME_CHECK_INTERVAL:
+                    rounds_per_second = num_rounds / max(now - time_manager.started_at, 1e-3)
+                else:
+                    rounds_per_second = time_manager.rounds_per_second
+                if time_manager.should_stop(now, visits[0], visits[1], rounds_per_second):
+                    break
+
+            self.execute_round()
+            num_rounds += 1
+
+        elapsed = time.time() - time_manager.started_at
+        time_manager.end_search(num_rounds / elapsed if num_rounds >= TIME_CHECK_INTERVAL else None)
+        return num_rounds
     
     
     def execute_round(self):
-        node = self.select_node(self.root)
-        if node == None:
+        # Leaves are gathered first and scored together in one evaluator pass
+        paths = []
+        start = time.perf_counter()
+        for _ in range(self.leaf_batch_size):
+            path = self.select_node(self.root)
+            if path == None:
+                break
+            paths.append(path)
+        selected = time.perf_counter()
+        self.timings["selection"] += selected - start
+
+        if len(paths) == 0:
             print("Fully explored tree")
-            return
-        reward = evaluate_state(node.state)
-        self.back_propogate(node, reward)
+            return False
+
+        if self.playout_depth > 0:
+            rewards = [self.playout(nodes[-1]) for nodes, _, _ in paths]
+        else:
+            rewards = evaluate_states([self.pool.states[nodes[-1]] for nodes, _, _ in paths], self.evaluation_weights)
+        self.timings["evaluation"] += time.perf_counter() - selected
+        for path, reward in zip(paths, rewards):
+            self.back_propogate(path, reward)
+
+        if self.node_budget is not None and self.pool.get_state_count() > self.node_budget:
+            self.evict()
+        return True
         
-    def select_node(self, node: Node):
-        while not node.is_terminal:
-            if node.is_fully_expanded:
-                node = self.get_best_child(node, self.exploration_constant)
+    def select_node(self, node):
+        """
+        Nodes from node down to a new or terminal leaf, with the edges taken between them
+        and in decoupled mode the arms every node's characters picked
+        """
+        pool = self.pool
+        nodes = [node]
+        edges = []
+        arms = []
+        while not pool.is_terminal(node):
+            if self.decoupled:
+                edge, node_arms, is_expansion = self.select_arms(node)
+                arms.append(node_arms)
             else:
-                return self.expand(node)
+                is_expansion = not pool.is_fully_expanded(node) and pool.edge_count[node] < self.get_child_limit(node)
+                if is_expansion:
+                    start = time.perf_counter()
+                    edge = self.expand(node)
+                    self.timings["expansion"] += time.perf_counter() - start
+                else:
+                    edge = self.get_best_edge(node, self.exploration_constant)
+            if edge == -1:
+                return None
+
+            node = pool.edge_child[edge]
+            if pool.states[node] is None:
+                pool.restore_state(node, pool.states[nodes[-1]].run_actions(pool.edge_actions[edge]))
+            nodes.append(node)
+            edges.append(edge)
+            if is_expansion:
+                break
             
-        return node
+        return nodes, edges, arms
     
-    def expand(self, node: Node):
-        if not node.is_fully_expanded and len(node.to_explore) == 0:
-            actions = get_action_set(node.state)
-            node.to_explore += actions
-        
-        if not node.is_fully_expanded:
-            action = node.to_explore.pop()
-            new_node = Node(node.state.run_actions(action), node, action)
-            node.children.append(new_node)
-            if len(node.to_explore) == 0:
-                node.is_fully_expanded = True
+    def get_child_limit(self, node):
+        if self.widening is None:
+            return self.max_children
+
+        constant, exponent = self.widening[self.pool.is_zombie_turn(node)]
+        return min(self.max_children, math.ceil(constant * max(self.pool.visits[node], 1) ** exponent))
+
+    def expand(self, node):
+        pool = self.pool
+        if pool.sources[node] is None:
+            state = pool.states[node]
+            is_decision = self.decision_sampling is not None and state.turn == pool.states[self.root].turn
+            pool.sources[node] = generate_joint_actions(state, self.decision_sampling if is_decision else self.sampling, self.top_k, self.rng)
+
+        action = next(pool.sources[node], None)
+        if action is None:
+            pool.set_fully_expanded(node)
+            return self.get_best_edge(node, self.exploration_constant)
+
+        edge = self.add_child(node, action)
+        if pool.edge_count[node] >= self.max_children:
+            pool.set_fully_expanded(node)
                 
-            return new_node
+        return edge
+
+    def add_child(self, node, action):
+        """
+        Edge from node to the state action leads to, shared with any node already holding that state
+        """
+        pool = self.pool
+        start = time.perf_counter()
+        new_state = pool.states[node].run_actions(action)
+        self.timings["cloning"] += time.perf_counter() - start
+        key = new_state.get_hash()
+        child = self.transpositions.get(key)
+        if child is None:
+            child = pool.add_node(new_state)
+            self.transpositions.put(key, child)
+
+        edge = pool.find_edge(node, child)
+        if edge == -1:
+            edge = pool.add_edge(node, child, action)
+        return edge
+
+    def select_arms(self, node):
+        """
+        Edge to the joint action the node's per-character bandits pick, the arms picked and whether the edge is new
+        """
+        pool = self.pool
+        bandits = pool.bandits[node]
+        if bandits is None:
+            bandits = pool.bandits[node] = CharacterBandits(get_action_options(pool.states[node], self.sampling != UNIFORM))
+
+        first = pool.first_edge[node]
+        is_full = pool.edge_count[node] >= self.get_child_limit(node)
+        arms = bandits.select(self.exploration_constant, self.rng, is_full)
+        position = bandits.children.get(arms)
+        if position is not None:
+            return first + position, arms, False
+
+        if is_full:
+            # The arms that are played and rewarded are the child's, not the picks it stands in for
+            position = bandits.get_nearest_child(arms)
+            return first + position, bandits.edge_arms[position], False
+
+        start = time.perf_counter()
+        edge = self.add_child(node, bandits.get_joint_action(arms))
+        self.timings["expansion"] += time.perf_counter() - start
+        # add_child may return an existing edge when two joint actions lead to the same state
+        bandits.add_child(arms, edge - pool.first_edge[node])
+        return edge, arms, True
                 
-    def back_propogate(self, node: Node, reward):
-        is_zombie_turn = node.is_zombie_turn
-        while node is not None:
-            node.num_visits += 1
-            if is_zombie_turn == node.is_zombie_turn:
-                node.total_reward += reward
-            else:
-                node.total_reward -= reward
-                is_zombie_turn = node.is_zombie_turn
+    def playout(self, node):
+        # Played in place on the leaf's own state and undone straight after, so nothing is cloned
+        state = self.pool.states[node]
+        records = state.playout(self.playout_depth, self.playout_policy, self.rng)
+
+        reward = evaluate_states([state], self.evaluation_weights)[0]
+        if state.get_is_zombie_turn() != self.pool.is_zombie_turn(node):
+            reward = -reward
+
+        for record in reversed(records):
+            state.undo(record)
+
+        return reward
+
+    def back_propogate(self, path, reward):
+        """
+        Rewards are from the point of view of the side to move at the leaf, each edge stores them from the point of view
+        of the side choosing at its parent so selection can always maximise
+        """
+        pool = self.pool
+        nodes, edges, arms = path
+        leaf_is_zombie_turn = pool.is_zombie_turn(nodes[-1])
+        for depth in range(len(nodes) - 1, -1, -1):
+            pool.visits[nodes[depth]] += 1
+
+            if depth > 0:
+                edge = edges[depth - 1]
+                value = reward if pool.is_zombie_turn(nodes[depth - 1]) == leaf_is_zombie_turn else -reward
+                pool.edge_visits[edge] += 1
+                pool.edge_reward[edge] += value
+                # Every character's arm shares the joint action's reward
+                if arms:
+                    pool.bandits[nodes[depth - 1]].update(arms[depth - 1], value)
                 
-            node = node.parent
             reward *= self.eps
             
-    def get_best_child(self, node: Node, exploration_value):
-        best_value = float("-inf")
-        best_node = None
-        
-        for child in node.children:
-            node_value = child.total_reward / child.num_visits + exploration_value * math.sqrt(2 * math.log(node.num_visits) / child.num_visits)
-            if node_value > best_value:
-                best_value = node_value
-                best_node = child
-                
-        return best_node
-            
-            
-            
-        
\ No newline at end of file
+    def get_best_edge(self, node, exploration_value):
+        """
+        Edge to the child with the best upper confidence bound, read from the node's contiguous edge block
+        """
+        pool = self.pool
+        first = pool.first_edge[node]
+        end = first + pool.edge_count[node]
+        visits = pool.edge_visits[first:end]
+        if not visits:
+            return -1
+
+        # Children expanded earlier in the same batch have not been scored yet
+        if 0 in visits:
+            return first + visits.index(0)
+
+        scale = 2 * math.log(pool.visits[node])
+        values = [reward / count + exploration_value * math.sqrt(scale / count) for reward, count in zip(pool.edge_reward[first:end], visits)]
+        return first + values.index(max(values))
+
+    def get_most_visited_edge(self, node):
+        """
+        Edge the search settled on, the most visited with ties going to the better mean reward
+        """
+        pool = self.pool
+        first = pool.first_edge[node]
+        end = first + pool.edge_count[node]
+        visits = pool.edge_visits[first:end]
+        if not visits or max(visits) == 0:
+            return -1
+
+        most = max(visits)
+        return max((edge for edge in range(first, end) if pool.edge_visits[edge] == most), key=lambda edge: pool.edge_reward[edge] / most)
+
+    def get_metrics(self):
+        """
+        Summary of the last search and the tree it left, one telemetry record
+        """
+        pool = self.pool
+        root = self.root
+
+        # Depth of each node from the root, the shallowest path for nodes reached through transpositions
+        depths = {root: 0}
+        frontier = [root]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for node in frontier:
+                for edge in pool.get_edges(node):
+                    child = pool.edge_child[edge]
+                    if child not in depths:
+                        depths[child] = depth
+                        next_frontier.append(child)
+            frontier = next_frontier
+        max_depth = max(depths.values())
+
+        first = pool.first_edge[root]
+        end = first + pool.edge_count[root]
+        root_visits = list(pool.edge_visits[first:end])
+        # Mean reward of the chosen move against the runner-up, both ranked by visits like the choice
+        ranked = sorted(((count, reward / count) for reward, count in zip(pool.edge_reward[first:end], root_visits) if count), reverse=True)
+        values = [value for _, value in ranked]
+
+        timings = self.timings
+        return {
+            "turn": pool.states[root].turn,
+            "rounds": self.num_rounds,
+            "seconds": self.search_seconds,
+            "rounds_per_second": self.num_rounds / self.search_seconds if self.search_seconds else 0.0,
+            "nodes": len(depths),
+            "states": pool.get_state_count(),
+            "evictions": self.evictions,
+            "max_depth": max_depth,
+            "mean_depth": sum(depths.values()) / len(depths),
+            "branching_factor": get_branching_factor(len(depths), max_depth),
+            "root_visits": root_visits,
+            "selection_seconds": timings["selection"] - timings["expansion"],
+            "expansion_seconds": timings["expansion"] - timings["cloning"],
+            "cloning_seconds": timings["cloning"],
+            "evaluation_seconds": timings["evaluation"],
+            "margin": values[0] - values[1] if len(values) > 1 else None,
+        }
+
+
+class SearchSession:
+    """
+    One TreeSearch kept alive for a whole game, re-rooted on the state the engine reports each turn
+    so the statistics gathered for the line actually played carry over
+
+    Between turns a background thread can keep searching the line our chosen actions lead to
+    """
+
+    def __init__(self, player_is_zombie, exploration_constant = .1, eps = .9, time_manager: TimeManager | None = None, telemetry_path = None,
+                 **search_options):
+        self.player_is_zombie = player_is_zombie
+        self.exploration_constant = exploration_constant
+        self.eps = eps
+        search_options.setdefault("node_budget", DEFAULT_NODE_BUDGET)
+        search_options.setdefault("widening", DEFAULT_WIDENING)
+        self.search_options = search_options
+        # Without one every search runs for the tree's fixed time_limit
+        self.time_manager = time_manager
+        # JSONL file each search appends its metrics to, None to keep none
+        self.telemetry_path = telemetry_path
+        self.tree: TreeSearch | None = None
+        self.reused_visits = 0
+        self.ponder_thread: threading.Thread | None = None
+        self.ponder_stop = threading.Event()
+        self.ponder_rounds = 0
+
+    def decide(self, game_state: GameState, cooldowns):
+        """
+        Best actions for each of our phases this turn
+        """
+        self.stop_pondering()
+        node = self.tree.find_node(game_state, cooldowns) if self.tree else None
+
+        if node is None:
+            self.tree = TreeSearch(game_state, cooldowns, GamePhase.MOVE, self.exploration_constant, self.eps, self.player_is_zombie, **self.search_options)
+            self.reused_visits = 0
+        else:
+            self.tree.promote(node)
+            self.reused_visits = self.tree.pool.visits[self.tree.root]
+
+        actions = self.tree.search(self.time_manager)
+        if self.telemetry_path:
+            record = self.tree.get_metrics()
+            record["reused_visits"] = self.reused_visits
+            record["ponder_rounds"] = self.ponder_rounds
+            write_record(self.telemetry_path, record)
+
+        return actions
+
+    def start_pondering(self):
+        """
+        Searches the tree in a background thread until stop_pondering, call once our last action of the turn has been sent
+        """
+        if self.tree is None or self.ponder_thread is not None:
+            return
+
+        # Our actions are settled, so only the opponent's replies to them are worth searching.
+        # Promoted here rather than in the thread so a long promote can never be cut off by the next message
+        if self.tree.principal_node is not None:
+            self.tree.promote(self.tree.principal_node)
+            self.tree.principal_node = None
+
+        self.ponder_stop = threading.Event()
+        self.ponder_thread = threading.Thread(target=self.ponder, args=(self.tree, self.ponder_stop), daemon=True)
+        self.ponder_thread.start()
+
+    def ponder(self, tree: TreeSearch, stop: threading.Event):
+        self.ponder_rounds = 0
+        deadline = time.time() + PONDER_TIME_LIMIT
+        while not stop.is_set() and time.time() < deadline:
+            if not tree.execute_round():
+                break
+            self.ponder_rounds += 1
+
+    def stop_pondering(self):
+        if self.ponder_thread is None:
+            return
+
+        self.ponder_stop.set()
+        self.ponder_thread.join(PONDER_JOIN_TIMEOUT)
+        if self.ponder_thread.is_alive():
+            # The reply never waits on a slow round, the thread finishes it on a tree nobody uses any more
+            self.tree = None
+        self.ponder_thread = None
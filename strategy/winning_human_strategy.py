@@ -4,8 +4,11 @@
 # If there are any zombies in attack range, attack the closest
 # If a Medic's ability is available, heal a human in range with the least health
 
+import os
 import random
-from strategy.tree_search import TreeSearch
+from strategy.parallel_search import create_session
+from strategy.time_manager import TimeManager
+from strategy.telemetry import get_telemetry_path
 from game.character.action.ability_action import AbilityAction
 from game.character.action.ability_action_type import AbilityActionType
 from game.character.action.attack_action import AttackAction
@@ -15,11 +18,21 @@ from game.character.character_class_type import CharacterClassType
 from game.game_state import GameState
 from game.util.position import Position
 from strategy.strategy import Strategy
-from strategy.pyengine import PyGameState, GamePhase
+from strategy.pyengine import PyGameState
 
 # Key is id, value is a tuple where the first value is attack cooldown and second is ability cooldown
 my_cooldowns: dict[str, tuple[int, int]] = {}
 actions = [[], [], []]
+# Kept for the whole game so each turn's search starts from the tree built on the previous one,
+# or with SEARCH_WORKERS above 1 so the worker processes are only started once.
+# SEARCH_PARALLELISM picks "root" for a tree per worker or "tree" for one tree in shared memory
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", "1"))
+SEARCH_PARALLELISM = os.environ.get("SEARCH_PARALLELISM", "root")
+# Budgets each turn's search over the whole game, timed from when the engine's message arrived
+clock = TimeManager()
+# Per-turn search metrics go next to the gamelog main.run names in OUTPUT
+TELEMETRY_PATH = get_telemetry_path(os.environ.get("OUTPUT"), "human")
+session = create_session(False, SEARCH_WORKERS, SEARCH_PARALLELISM, clock, TELEMETRY_PATH)
 
 class WinningHumanStrategy(Strategy):
     def decide_character_classes(
@@ -56,8 +69,7 @@ class WinningHumanStrategy(Strategy):
                 my_cooldowns[character_id] = (0, 0)
                 
 
-        TS = TreeSearch(game_state, my_cooldowns, GamePhase.MOVE, .1, .9, False)
-        actions = TS.search()
+        actions = session.decide(game_state, my_cooldowns)
         
         return actions[0]
 
@@ -83,3 +95,14 @@ class WinningHumanStrategy(Strategy):
         global actions
 
         return actions[2]
+
+    def start_pondering(self, phase: str):
+        # Called by main once a response is sent, our turn is over after the ability phase
+        if phase == "ABILITY":
+            session.start_pondering()
+
+    def stop_pondering(self):
+        session.stop_pondering()
+
+    def start_clock(self, received_at: float):
+        clock.start_clock(received_at)
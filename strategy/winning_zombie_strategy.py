@@ -2,8 +2,11 @@
 # Move directly towards the closest human. If there are any humans in attacking range, attack a random one.
 # If there are no humans in attacking range but there are obstacles, attack a random obstacle.
 
+import os
 import random
-from strategy.tree_search import TreeSearch
+from strategy.parallel_search import create_session
+from strategy.time_manager import TimeManager
+from strategy.telemetry import get_telemetry_path
 from game.character.action.ability_action import AbilityAction
 from game.character.action.ability_action_type import AbilityActionType
 from game.character.action.attack_action import AttackAction
@@ -13,11 +16,21 @@ from game.character.character_class_type import CharacterClassType
 from game.game_state import GameState
 from game.util.position import Position
 from strategy.strategy import Strategy
-from strategy.pyengine import PyGameState, GamePhase
+from strategy.pyengine import PyGameState
 
 
 my_cooldowns: dict[str, tuple[int, int]] = {}
 actions = [[], []]
+# Kept for the whole game so each turn's search starts from the tree built on the previous one,
+# or with SEARCH_WORKERS above 1 so the worker processes are only started once.
+# SEARCH_PARALLELISM picks "root" for a tree per worker or "tree" for one tree in shared memory
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", "1"))
+SEARCH_PARALLELISM = os.environ.get("SEARCH_PARALLELISM", "root")
+# Budgets each turn's search over the whole game, timed from when the engine's message arrived
+clock = TimeManager()
+# Per-turn search metrics go next to the gamelog main.run names in OUTPUT
+TELEMETRY_PATH = get_telemetry_path(os.environ.get("OUTPUT"), "zombie")
+session = create_session(True, SEARCH_WORKERS, SEARCH_PARALLELISM, clock, TELEMETRY_PATH)
 
 class WinningZombieStrategy(Strategy):
     
@@ -35,8 +48,7 @@ class WinningZombieStrategy(Strategy):
             for character_id in game_state.characters.keys():
                 my_cooldowns[character_id] = (0, 0)
                 
-        TS = TreeSearch(game_state, my_cooldowns, GamePhase.MOVE, .1, .9, False)
-        actions = TS.search()
+        actions = session.decide(game_state, my_cooldowns)
 
         return actions[0]
 
@@ -48,4 +60,15 @@ class WinningZombieStrategy(Strategy):
         
         global actions
 
-        return actions[0]
+        return actions[1]
+
+    def start_pondering(self, phase: str):
+        # Called by main once a response is sent, our turn is over after the attack phase
+        if phase == "ATTACK":
+            session.start_pondering()
+
+    def stop_pondering(self):
+        session.stop_pondering()
+
+    def start_clock(self, received_at: float):
+        clock.start_clock(received_at)